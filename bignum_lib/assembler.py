@@ -11,15 +11,12 @@ class Assembler:
     TOK_LOOP = 'loop'
     TOK_SPECIAL = [')', '}']
 
-    # List of addresses where functions are closed
-    funclose = []
-
-    # the program (mnem, (param_string, line))
-    instr = []
-
-    ins_objects = []
-
     def __init__(self, lines):
+        # List of addresses where functions are closed
+        self.funclose = []
+        # the program (mnem, (param_string, line))
+        self.instr = []
+        self.ins_objects = []
         self.ins_fac = InstructionFactory()
         self.lines = lines
         self.ctx = self.__create_index()
@@ -2,16 +2,17 @@
 # Licensed under the Apache License, Version 2.0, see LICENSE for details.
 # SPDX-License-Identifier: Apache-2.0
 
+from array import array
+
 from . instructions import *
 
 
 class Disassembler:
-    ctx = InsContext()
-    ins_objects = []
-    loopendstack = []
-    asm_lines = []
-
     def __init__(self, lines, label_lines=None, opt_print_bitmaps=False):
+        self.ctx = InsContext()
+        self.ins_objects = []
+        self.loopendstack = []
+        self.asm_lines = []
         self.ins_fac = InstructionFactory()
         self.lines = lines
         if label_lines:
@@ -42,9 +43,44 @@ class Disassembler:
             if line.endswith(':'):
                 label = line[:-1]
 
-    def __dis_instr(self, ins_str):
+    @staticmethod
+    def read_words(lines):
+        """Read the instruction words of a hex file into an array in a single pass"""
+        words = array('I')
+        for line in lines:
+            if not line:
+                break
+            line = line.strip().lower()
+            if len(line.split(':', 1)) == 2:
+                line = line.split(':')[1].strip()
+            if line.startswith("0x"):
+                if len(line[2:10]) != 8:
+                    raise ValueError("Wrong length of instruction. Must be 8 hex digits.")
+                words.append(int(line[2:10], 16))
+        return words
+
+    @staticmethod
+    def scan_malformed(words):
+        """Get the addresses of all malformed words (including unknown opcodes) in an array from read_words()
+
+        Each distinct word is only decoded once, no assembly is generated."""
+        ins_fac = InstructionFactory()
+        ctx = InsContext()
+        malformed_words = {}
+        addrs = []
+        for addr, word in enumerate(words):
+            if word not in malformed_words:
+                try:
+                    malformed_words[word] = ins_fac.factory_bin(word, ctx).malformed
+                except UnknownOpcodeError:
+                    malformed_words[word] = True
+            if malformed_words[word]:
+                addrs.append(addr)
+        return addrs
+
+    def __dis_instr(self, word):
         try:
-            ins_object = self.ins_fac.factory_bin(ins_str[2:10], self.ctx)
+            ins_object = self.ins_fac.factory_bin(word, self.ctx)
             hexstr, asm_str, malformed = ins_object.get_asm_str()
 
         except UnknownOpcodeError:
@@ -58,20 +94,18 @@ class Disassembler:
         if 0 not in self.ctx.functions:
             self.ctx.functions.update({0: 'fun0'})
         any_malformed = False
-        for line in lines:
-            if not line:
-                break
-            line = line.strip().lower()
-            if len(line.split(':', 1)) == 2:
-                line = line.split(':')[1].strip()
-            if line.startswith("0x"):
-                hexstr, asm_str, malformed, ins_object = self.__dis_instr(line)
-                if opt_print_bitmaps:
-                    print(ins_object.get_enc_tab())
-                self.ins_objects.append((hexstr, asm_str, malformed, ins_object))
-                if malformed:
-                    any_malformed = True
-                    print('malformed instruction word: ' + hexstr)
+        # Repeated words are only decoded once (the instruction objects are interned by the factory anyway)
+        decoded = {}
+        for word in self.read_words(lines):
+            if word not in decoded:
+                decoded[word] = self.__dis_instr(word)
+            hexstr, asm_str, malformed, ins_object = decoded[word]
+            if opt_print_bitmaps:
+                print(ins_object.get_enc_tab())
+            self.ins_objects.append((hexstr, asm_str, malformed, ins_object))
+            if malformed:
+                any_malformed = True
+                print('malformed instruction word: ' + hexstr)
         if any_malformed:
             print('Warning: There were malformed instructions')
         else:
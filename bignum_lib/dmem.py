@@ -0,0 +1,131 @@
+# Copyright lowRISC contributors.
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+
+class ByteDmem(object):
+    """Data memory stored in a single contiguous bytearray
+
+    Each word occupies word_bytes bytes in little-endian order. A multi-word value with its least significant word
+    at the lowest address is hence a contiguous little-endian byte sequence and is read or written with a single
+    int.from_bytes()/int.to_bytes() (see read_words() and write_words()).
+
+    The memory can be accessed like the list of ints used by default for Machine.dmem (indexing by word address,
+    slices, len()). Assigning a bytes-like object to a slice copies raw memory contents, e.g. dmem[:] = image with
+    an image from get_image()."""
+
+    def __init__(self, depth, word_bytes):
+        self.depth = depth
+        self.word_bytes = word_bytes
+        self.buf = bytearray(depth * word_bytes)
+        self.view = memoryview(self.buf)
+
+    def __len__(self):
+        return self.depth
+
+    def __check_address(self, address):
+        if address < 0 or address >= self.depth:
+            raise IndexError('dmem address out of range')
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(self.depth))]
+        self.__check_address(key)
+        pos = key * self.word_bytes
+        return int.from_bytes(self.view[pos:pos + self.word_bytes], 'little')
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.depth)
+            if isinstance(value, (bytes, bytearray, memoryview)) and step == 1:
+                if len(value) != (stop - start) * self.word_bytes:
+                    raise ValueError('Image size does not match the dmem range')
+                self.view[start * self.word_bytes:stop * self.word_bytes] = value
+                return
+            addresses = range(start, stop, step)
+            value = list(value)
+            if len(value) != len(addresses):
+                raise ValueError('Number of words does not match the dmem range')
+            for address, word in zip(addresses, value):
+                self[address] = word
+            return
+        self.__check_address(key)
+        pos = key * self.word_bytes
+        self.view[pos:pos + self.word_bytes] = value.to_bytes(self.word_bytes, 'little')
+
+    def __iter__(self):
+        for address in range(self.depth):
+            yield self[address]
+
+    def get_view(self, address, cnt):
+        """Get a memoryview on cnt words starting at address"""
+        self.__check_address(address)
+        self.__check_address(address + cnt - 1)
+        return self.view[address * self.word_bytes:(address + cnt) * self.word_bytes]
+
+    def read_words(self, address, cnt):
+        """Read a cnt words wide value (least significant word at address)"""
+        return int.from_bytes(self.get_view(address, cnt), 'little')
+
+    def write_words(self, address, cnt, value):
+        """Write a cnt words wide value (least significant word at address)"""
+        self.get_view(address, cnt)[:] = value.to_bytes(cnt * self.word_bytes, 'little')
+
+    def get_image(self):
+        """Get a copy of the memory contents, e.g. to hand it to another process"""
+        return bytes(self.buf)
+
+
+class InitBitmap(object):
+    """Initialization state of the dmem words (see ByteDmem) held in a bitmap
+
+    Can be accessed like the list of booleans used by default for Machine.init_dmem. Assigning a bytes-like object
+    to the full range (bitmap[:] = image) copies an image from get_image()."""
+
+    def __init__(self, depth):
+        self.depth = depth
+        self.bits = bytearray((depth + 7) // 8)
+
+    def __len__(self):
+        return self.depth
+
+    def __getitem__(self, address):
+        if address < 0 or address >= self.depth:
+            raise IndexError('dmem address out of range')
+        return bool(self.bits[address >> 3] & (1 << (address & 7)))
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            if isinstance(value, (bytes, bytearray, memoryview)) and key == slice(None):
+                self.bits[:] = value
+                return
+            addresses = range(*key.indices(self.depth))
+            value = list(value)
+            if len(value) != len(addresses):
+                raise ValueError('Number of flags does not match the dmem range')
+            for address, flag in zip(addresses, value):
+                self[address] = flag
+            return
+        if key < 0 or key >= self.depth:
+            raise IndexError('dmem address out of range')
+        if value:
+            self.bits[key >> 3] |= 1 << (key & 7)
+        else:
+            self.bits[key >> 3] &= ~(1 << (key & 7)) & 0xff
+
+    def __iter__(self):
+        for address in range(self.depth):
+            yield self[address]
+
+    def set_range(self, address, cnt):
+        """Mark cnt words starting at address as initialized"""
+        for i in range(address, address + cnt):
+            self[i] = True
+
+    def get_image(self):
+        """Get a copy of the bitmap"""
+        return bytes(self.bits)
+
+
+if __name__ == "__main__":
+    raise Exception('This file is not executable')
@@ -0,0 +1,68 @@
+# Copyright lowRISC contributors.
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+from collections import deque
+from itertools import chain
+
+
+class History(object):
+    """Bounded history of machine states for reverse execution (see Machine.enable_history())
+
+    Points in time are given as the number of instructions the machine executed so far, each entry also holds the
+    number of cycles executed up to that point. The history holds a ring
+    of periodic snapshots, taken every interval instructions, and an undo log with a snapshot at each of the last
+    undo_depth stops in the debugger. Steps without a stop don't take a snapshot, so single stepping through a
+    long run costs little more than without history. Older entries are dropped, so memory use is bounded by
+    max_snapshots + undo_depth snapshots (each of them holds a copy of dmem). Any earlier state still covered by
+    the history is reached by restoring the closest snapshot before it and executing the remaining instructions
+    again."""
+
+    def __init__(self, interval, max_snapshots, undo_depth):
+        if interval < 1 or max_snapshots < 1:
+            raise Exception('Snapshot interval and number of snapshots must be at least 1')
+        self.interval = interval
+        self.snapshots = deque(maxlen=max_snapshots)
+        self.undo_log = deque(maxlen=undo_depth)
+
+    def get_next_snapshot_time(self):
+        """Get the point in time at which the next periodic snapshot is due"""
+        if not self.snapshots:
+            return 0
+        return self.snapshots[-1][0] + self.interval
+
+    def record(self, time, m):
+        """Take a periodic snapshot of machine m if one is due"""
+        if time >= self.get_next_snapshot_time():
+            self.snapshots.append((time, m.executed_cycle_cnt, m.snapshot()))
+
+    def record_break(self, time, m):
+        """Add the state of machine m at a stop in the debugger to the undo log"""
+        entry = (time, m.executed_cycle_cnt, m.snapshot())
+        self.undo_log.append(entry)
+        if time >= self.get_next_snapshot_time():
+            self.snapshots.append(entry)
+
+    def get_entries_before(self, time):
+        """Get a list of (time, cycles, snapshot) tuples for all snapshots taken before time, latest first"""
+        entries = dict((entry[0], entry) for entry in chain(self.snapshots, self.undo_log) if entry[0] < time)
+        return sorted(entries.values(), key=lambda entry: entry[0], reverse=True)
+
+    def find(self, time):
+        """Get the latest (time, cycles, snapshot) tuple at or before time, None if the history does not reach back
+        that far"""
+        entries = self.get_entries_before(time + 1)
+        if not entries:
+            return None
+        return entries[0]
+
+    def truncate(self, time):
+        """Drop all entries taken at or after time (e.g. after going back in time, they are taken again when
+        execution continues)"""
+        for entries in (self.snapshots, self.undo_log):
+            while entries and entries[-1][0] >= time:
+                entries.pop()
+
+
+if __name__ == "__main__":
+    raise Exception('This file is not executable')
@@ -2,6 +2,8 @@
 # Licensed under the Apache License, Version 2.0, see LICENSE for details.
 # SPDX-License-Identifier: Apache-2.0
 
+from types import MappingProxyType
+
 from . machine import *
 
 
@@ -259,12 +261,13 @@ class InvalidOp2(ValueError):
 
 
 class InsContext(object):
-    instructions = {}
-    functions = {}
-    labels = {}
-    loopranges = []
-    functioncnt = 0
-    labelcnt = 0
+    def __init__(self):
+        self.instructions = {}
+        self.functions = {}
+        self.labels = {}
+        self.loopranges = []
+        self.functioncnt = 0
+        self.labelcnt = 0
 
     def get_or_add_function(self, addr):
         if addr not in self.functions:
@@ -299,7 +302,6 @@ class AsmCtx:
         self.labels = labels
 
         self.ins_ctx = InsContext()
-        self.ins_ctx.functions.clear()
         for k in functions:
             if isinstance(functions[k], tuple):
                 self.ins_ctx.functions.update({functions[k][0]: k})
@@ -356,41 +358,18 @@ class AsmCtx:
 
 
 class InstructionFactory(object):
+    """Creates instruction objects from assembly strings or binary instruction words
 
-    # Mapping of mnemonics to instruction classes
-    mnem_map = {}
-    opcode_map = {}
+    Instruction classes are looked up in MNEM_MAP and OPCODE_TABLE, which are built once when this module is
+    imported. Instruction objects are interned, identical instruction words with the same context share one
+    object. Instruction objects must hence not hold any state depending on their address."""
 
     def __init__(self):
-        self.__register_mnemonics(Ins)
-        self.__register_opcodes(Ins)
-
-    def __register_mnemonics(self, class_p):
-        """ Find all final classes derived from Ins and append their mnemonic and class type to dictionary"""
-        for cls in class_p.__subclasses__():
-            if len(cls.__subclasses__()) > 0:
-                self.__register_mnemonics(cls)
-            else:
-                if isinstance(cls.MNEM, str):
-                    if cls.MNEM in self.mnem_map:
-                        raise Exception('Error adding mnemonic \'' + cls.MNEM + '\' for class ' + cls.__name__
-                                        + '. Mnemonic already in use.')
-                    self.mnem_map.update({cls.MNEM: cls})
-                elif isinstance(cls.MNEM, dict):
-                    for item in cls.MNEM.values():
-                        if item in self.mnem_map:
-                            raise Exception('Error adding mnemonic \'' + item + '\' for class ' + cls.__name__
-                                            + '. Mnemonic already in use.')
-                        self.mnem_map.update({item: cls})
-                else:
-                    raise Exception('Invalid mnemonic format for class ' + cls.__name__)
-
-    def __register_opcodes(self, class_p):
-        for cls in class_p.__subclasses__():
-            if len(cls.__subclasses__()) > 0:
-                self.__register_opcodes(cls)
-            else:
-                self.opcode_map.update({cls.OP: cls})
+        # Instruction objects by (instruction word, context)
+        self.interned = {}
+
+    def __intern(self, ins_obj):
+        return self.interned.setdefault((ins_obj.ins, ins_obj.ctx), ins_obj)
 
     def factory_asm(self, addr, asm_str, ctx):
         """Create instruction class object, based on assembly string"""
@@ -401,8 +380,8 @@ class InstructionFactory(object):
             params = asm_split[1].strip()
         if not self.is_valid_mnem(mnem):
             raise SyntaxError('Unknown instruction: \'' + mnem + '\'')
-        ins_obj = self.mnem_map[mnem].from_assembly(addr, mnem, params, ctx)
-        return ins_obj
+        ins_obj = MNEM_MAP[mnem].from_assembly(addr, mnem, params, ctx)
+        return self.__intern(ins_obj)
 
     def factory_bin(self, ins_in, ctx):
         """Create instruction class object. Works for hexstrings or integers"""
@@ -413,15 +392,17 @@ class InstructionFactory(object):
                 raise ValueError("Wrong length of instruction. Must be 8 hex digits.")
         else:
             ins = ins_in
-        op_bits = ins >> Ins.OP_POS
-        ins_class = self.opcode_map[op_bits]
+        key = (ins, ctx)
+        if key in self.interned:
+            return self.interned[key]
+        ins_class = OPCODE_TABLE[ins >> Ins.OP_POS]
         if ins_class:
-            return ins_class.from_ins_word(ins, ctx)
+            return self.__intern(ins_class.from_ins_word(ins, ctx))
         else:
             raise UnknownOpcodeError("Unknown opcode")
 
     def is_valid_mnem(self, mnem):
-        return mnem in self.mnem_map
+        return mnem in MNEM_MAP
 
 
 class Ins(object):
@@ -438,16 +419,17 @@ class Ins(object):
 
     CYCLES = 1
 
-    malformed = False
-    fun = 0
+    __slots__ = ('ins', 'ctx', 'fun', 'malformed', 'execute')
 
     zero_ranges = []
 
     def __init__(self, ins, ctx):
         self.ins = ins
         self.ctx = ctx
+        self.malformed = False
         self.check_zero_ranges()
         self.dec()
+        self.bind_execute()
 
     @classmethod
     def from_ins_word(cls, ins, ctx):
@@ -464,17 +446,54 @@ class Ins(object):
 
     def get_bit_slice(self, pos, slice_len):
         if (slice_len + pos) <= self.INS_LEN and pos >= 0:
-            return (self.ins >> pos) & (2 ** slice_len - 1)
+            return (self.ins >> pos) & ((1 << slice_len) - 1)
         else:
             raise ValueError("Invalid slice")
 
     @staticmethod
     def get_gen_bit_slice(src, pos, slice_len):
-        return (src >> pos) & (2 ** slice_len - 1)
+        return (src >> pos) & ((1 << slice_len) - 1)
 
     def dec(self):
         self.fun = self.get_bit_slice(self.FUN_POS, self.FUN_LEN)
 
+    def bind_execute(self):
+        """Bind a specialized execute handler to this instruction object.
+
+        Classes covering several mnemonics override this to select the handler for the decoded mnemonic once,
+        so executing the instruction is a single call without any mnemonic lookups."""
+        pass
+
+    def get_handler(self, mnem):
+        """Get the execute handler for a mnemonic ('_execute_<mnem>')"""
+        if mnem is None:
+            return self._execute_invalid
+        return getattr(self, '_execute_' + mnem)
+
+    def _execute_invalid(self, m):
+        raise Exception('Invalid opcode')
+
+    def record_stats(self, stats):
+        """Record the statistics events of this instruction, except its execution count, in a
+        stats.StatsCollector.
+
+        The events only depend on the decoded instruction, so the translator records them once for each
+        translated block (see translator.BlockTranslator)."""
+        pass
+
+    def translate(self, b):
+        """Emit Python code for this instruction into a translator.BlockBuilder.
+
+        Returns False if the instruction can't be translated, e.g. flow control instructions, which are always
+        executed by the interpreter."""
+        return False
+
+    def get_mnem(self):
+        """Get the mnemonic of the decoded instruction"""
+        if isinstance(self.MNEM, str):
+            return self.MNEM
+        return self.MNEM.get(self.fun)
+
     def get_byte(self, byte):
         return self.get_bit_slice(byte*8, 8)
 
@@ -558,10 +577,7 @@ class GIStd(Ins):
     RS1_RANGE = (RS1_POS+Ins.REG_LEN-1, RS1_POS)
     RS2_RANGE = (RS2_POS+Ins.REG_LEN-1, RS2_POS)
 
-    rd = 0
-    rs1 = 0
-    rs2 = 0
-    imm = 0
+    __slots__ = ('rd', 'rs1', 'rs2', 'imm')
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -606,8 +622,7 @@ class GIStdShift(GIStd):
     SHIFT_DIR_LEN = 1
     MAX_SHIFT = 31
 
-    shift_bytes = 0
-    shift_right = False
+    __slots__ = ('shift_bytes', 'shift_right')
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -644,6 +659,14 @@ class GIStdShift(GIStd):
         ret += shift_bytes
         return ret
 
+    def translate_rs2_op(self, b):
+        """Get an expression for the shifted rs2 operand in a translated block"""
+        if self.shift_right:
+            return '(' + b.reg(self.rs2) + ' >> ' + str(self.shift_bytes*8) + ')'
+        elif self.shift_bytes:
+            return '((' + b.reg(self.rs2) + ' << ' + str(self.shift_bytes*8) + ') & ' + str(b.xlen_mask) + ')'
+        return b.reg(self.rs2)
+
     @classmethod
     def enc(cls, addr, mnem, params, ctx):
         ret = 0
@@ -667,6 +690,8 @@ class GIStdNoParm(GIStd):
     """Generic Instruction with no parameters"""
     zero_ranges = [Ins.FUN_RANGE, GIStd.RD_RANGE, GIStd.RS2_RANGE, GIStd.RS1_RANGE, GIStd.IMM_RANGE]
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
@@ -695,9 +720,7 @@ class GIWideImm(Ins):
 
     zero_ranges = []
 
-    rd = 0
-    funi = 0
-    imm = 0
+    __slots__ = ('rd', 'funi', 'imm')
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -739,8 +762,7 @@ class GIMidImm(Ins):
 
     zero_ranges = []
 
-    funb = 0
-    imm = 0
+    __slots__ = ('funb', 'imm')
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -772,6 +794,8 @@ class IAdd(GIStdShift):
 
     # addi is not a shift instruction but also treated here since same opcode
     MNEM = {0b000: 'add', 0b001: 'addc', 0b010: 'addi', 0b100: 'addx', 0b101: 'addcx'}
+    # Flag group accessed by each mnemonic (for the statistics)
+    FLAG_GROUPS = {'add': 'n', 'addc': 'n', 'addi': 'n', 'addx': 'x', 'addcx': 'x'}
     OP = 0b010100
 
     # ugly hack to allow special treatment for addi (prevent overflow detection for shift imm value)
@@ -782,6 +806,8 @@ class IAdd(GIStdShift):
 
     zero_ranges = []
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
@@ -789,8 +815,7 @@ class IAdd(GIStdShift):
         super().dec()
         # test again with real max value if shit immediate is in bounds, since we deactivated it earlier
         if self.MNEM.get(self.fun) != 'addi':
-            self.MAX_SHIFT = super().MAX_SHIFT
-            if self.shift_bytes > self.MAX_SHIFT:
+            if self.shift_bytes > super().MAX_SHIFT:
                 self.malformed = True
 
     def get_asm_str(self):
@@ -823,37 +848,76 @@ class IAdd(GIStdShift):
         else:
             return super().enc(addr, mnem, params, ctx)
 
-    def execute(self, m):
-        if self.MNEM.get(self.fun) != 'addi':
-            if self.shift_right:
-                rs2op = (m.get_reg(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
-            else:
-                rs2op = (m.get_reg(self.rs2) << self.shift_bytes*8) & m.xlen_mask
-        if self.MNEM.get(self.fun) == 'add':
-            res = m.get_reg(self.rs1) + rs2op
-            m.stat_record_flag_access('n', self.MNEM.get(self.fun))
-            m.set_c_z_m_l(res)
-        elif self.MNEM.get(self.fun) == 'addc':
-            res = m.get_reg(self.rs1) + rs2op + int(m.get_flag('C'))
-            m.stat_record_flag_access('n', self.MNEM.get(self.fun))
-            m.set_c_z_m_l(res)
-        elif self.MNEM.get(self.fun) == 'addi':
-            res = m.get_reg(self.rs1) + self.imm
-            m.stat_record_flag_access('n', self.MNEM.get(self.fun))
-            m.set_c_z_m_l(res)
-        elif self.MNEM.get(self.fun) == 'addx':
-            res = m.get_reg(self.rs1) + rs2op + int(m.get_flag('C'))
-            m.stat_record_flag_access('x', self.MNEM.get(self.fun))
-            m.setx_c_z_m_l(res)
-        elif self.MNEM.get(self.fun) == 'addcx':
-            res = m.get_reg(self.rs1) + rs2op + int(m.get_flag('XC'))
-            m.stat_record_flag_access('x', self.MNEM.get(self.fun))
-            m.setx_c_z_m_l(res)
+    def bind_execute(self):
+        self.execute = self.get_handler(self.MNEM.get(self.fun))
+
+    def record_stats(self, stats):
+        mnem = self.MNEM.get(self.fun)
+        if mnem is not None:
+            stats.record_flag_access(self.FLAG_GROUPS[mnem], mnem)
+
+    def get_rs2_op(self, m):
+        if self.shift_right:
+            return (m.get_reg_unchecked(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
+        else:
+            return (m.get_reg_unchecked(self.rs2) << self.shift_bytes*8) & m.xlen_mask
+
+    def _execute_add(self, m):
+        res = m.get_reg_unchecked(self.rs1) + self.get_rs2_op(m)
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        m.set_c_z_m_l(res)
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def _execute_addc(self, m):
+        res = m.get_reg_unchecked(self.rs1) + self.get_rs2_op(m) + int(m.get_flag('C'))
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        m.set_c_z_m_l(res)
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def _execute_addi(self, m):
+        res = m.get_reg_unchecked(self.rs1) + self.imm
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        m.set_c_z_m_l(res)
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def _execute_addx(self, m):
+        res = m.get_reg_unchecked(self.rs1) + self.get_rs2_op(m) + int(m.get_flag('C'))
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        m.setx_c_z_m_l(res)
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def _execute_addcx(self, m):
+        res = m.get_reg_unchecked(self.rs1) + self.get_rs2_op(m) + int(m.get_flag('XC'))
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        m.setx_c_z_m_l(res)
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def translate(self, b):
+        mnem = self.MNEM.get(self.fun)
+        if mnem is None:
+            return False
+        if mnem == 'addi':
+            res = b.tmp(b.reg(self.rs1) + ' + ' + str(self.imm))
+        elif mnem == 'add':
+            res = b.tmp(b.reg(self.rs1) + ' + ' + self.translate_rs2_op(b))
+        elif mnem == 'addcx':
+            res = b.tmp(b.reg(self.rs1) + ' + ' + self.translate_rs2_op(b) + ' + ' + b.flag('XC'))
         else:
-            raise Exception('Invalid opcode')
-        m.set_reg(self.rd, res & m.xlen_mask)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+            # addx uses the standard carry, like the interpreter
+            res = b.tmp(b.reg(self.rs1) + ' + ' + self.translate_rs2_op(b) + ' + ' + b.flag('C'))
+        b.set_c_z_m_l(res, x=mnem in ('addx', 'addcx'))
+        b.set_reg(self.rd, res + ' & ' + str(b.xlen_mask))
+        return True
 
 
 class IAddm(GIStdShift):
@@ -865,16 +929,23 @@ class IAddm(GIStdShift):
 
     zero_ranges = []
 
+    __slots__ = ()
+
     def execute(self, m):
         if self.shift_right:
-            rs2op = (m.get_reg(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
+            rs2op = (m.get_reg_unchecked(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
         else:
-            rs2op = (m.get_reg(self.rs2) << self.shift_bytes*8) & m.xlen_mask
-        res = (m.get_reg(self.rs1) + rs2op) % m.get_reg('mod')
+            rs2op = (m.get_reg_unchecked(self.rs2) << self.shift_bytes*8) & m.xlen_mask
+        res = (m.get_reg_unchecked(self.rs1) + rs2op) % m.get_reg('mod')
         m.set_z_m_l(res)
-        m.set_reg(self.rd, res)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        m.set_reg_unchecked(self.rd, res)
+        return False
+
+    def translate(self, b):
+        res = b.tmp('(' + b.reg(self.rs1) + ' + ' + self.translate_rs2_op(b) + ') % ' + b.sreg('mod'))
+        b.set_z_m_l(res)
+        b.set_reg(self.rd, res)
+        return True
 
 
 class ISub(GIStdShift):
@@ -882,6 +953,8 @@ class ISub(GIStdShift):
 
     # subi is not a shift instruction but also treated here since same opcode
     MNEM = {0b000: 'sub', 0b001: 'subb', 0b010: 'subi', 0b100: 'subx', 0b101: 'subbx'}
+    # Flag group accessed by each mnemonic (for the statistics)
+    FLAG_GROUPS = {'sub': 'n', 'subb': 'n', 'subi': 'n', 'subx': 'x', 'subbx': 'x'}
     OP = 0b010101
 
     # ugly hack to allow special treatment for subi (prevent overflow detection for shift imm value)
@@ -892,6 +965,8 @@ class ISub(GIStdShift):
 
     zero_ranges = []
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
@@ -899,8 +974,7 @@ class ISub(GIStdShift):
         super().dec()
         # test again with real max value if shit immediate is in bounds, since we deactivated it earlier
         if self.MNEM.get(self.fun) != 'subi':
-            self.MAX_SHIFT = super().MAX_SHIFT
-            if self.shift_bytes > self.MAX_SHIFT:
+            if self.shift_bytes > super().MAX_SHIFT:
                 self.malformed = True
 
     def get_asm_str(self):
@@ -933,43 +1007,87 @@ class ISub(GIStdShift):
         else:
             return super().enc(addr, mnem, params, ctx)
 
-    def execute(self, m):
-        if self.MNEM.get(self.fun) != 'subi':
-            if self.shift_right:
-                rs2op = (m.get_reg(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
-            else:
-                rs2op = (m.get_reg(self.rs2) << self.shift_bytes*8) & m.xlen_mask
-        b = m.get_reg(self.rs2) > m.get_reg(self.rs1)
-        if self.MNEM.get(self.fun) == 'sub':
-            res = m.get_reg(self.rs1) - rs2op
-            m.set_flag('C', b)
-            m.stat_record_flag_access('n', self.MNEM.get(self.fun))
-            m.set_z_m_l(res & m.xlen_mask)
-        elif self.MNEM.get(self.fun) == 'subb':
-            res = m.get_reg(self.rs1) - rs2op - int(m.get_flag('C'))
-            m.set_flag('C', b)
-            m.stat_record_flag_access('n', self.MNEM.get(self.fun))
-            m.set_z_m_l(res & m.xlen_mask)
-        elif self.MNEM.get(self.fun) == 'subi':
-            res = m.get_reg(self.rs1) - self.imm
-            m.set_flag('C', b)
-            m.stat_record_flag_access('n', self.MNEM.get(self.fun))
-            m.set_z_m_l(res & m.xlen_mask)
-        elif self.MNEM.get(self.fun) == 'subx':
-            res = m.get_reg(self.rs1) - rs2op
-            m.set_flag('XC', b)
-            m.stat_record_flag_access('x', self.MNEM.get(self.fun))
-            m.setx_z_m_l(res & m.xlen_mask)
-        elif self.MNEM.get(self.fun) == 'subbx':
-            res = m.get_reg(self.rs1) - rs2op - int(m.get_flag('XC'))
-            m.set_flag('XC', b)
-            m.stat_record_flag_access('x', self.MNEM.get(self.fun))
-            m.setx_z_m_l(res & m.xlen_mask)
+    def bind_execute(self):
+        self.execute = self.get_handler(self.MNEM.get(self.fun))
+
+    def record_stats(self, stats):
+        mnem = self.MNEM.get(self.fun)
+        if mnem is not None:
+            stats.record_flag_access(self.FLAG_GROUPS[mnem], mnem)
+
+    def get_rs2_op(self, m):
+        if self.shift_right:
+            return (m.get_reg_unchecked(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
+        else:
+            return (m.get_reg_unchecked(self.rs2) << self.shift_bytes*8) & m.xlen_mask
+
+    def _execute_sub(self, m):
+        b = m.get_reg_unchecked(self.rs2) > m.get_reg_unchecked(self.rs1)
+        res = m.get_reg_unchecked(self.rs1) - self.get_rs2_op(m)
+        m.set_flag('C', b)
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        m.set_z_m_l(res & m.xlen_mask)
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def _execute_subb(self, m):
+        b = m.get_reg_unchecked(self.rs2) > m.get_reg_unchecked(self.rs1)
+        res = m.get_reg_unchecked(self.rs1) - self.get_rs2_op(m) - int(m.get_flag('C'))
+        m.set_flag('C', b)
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        m.set_z_m_l(res & m.xlen_mask)
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def _execute_subi(self, m):
+        b = m.get_reg_unchecked(self.rs2) > m.get_reg_unchecked(self.rs1)
+        res = m.get_reg_unchecked(self.rs1) - self.imm
+        m.set_flag('C', b)
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        m.set_z_m_l(res & m.xlen_mask)
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def _execute_subx(self, m):
+        b = m.get_reg_unchecked(self.rs2) > m.get_reg_unchecked(self.rs1)
+        res = m.get_reg_unchecked(self.rs1) - self.get_rs2_op(m)
+        m.set_flag('XC', b)
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        m.setx_z_m_l(res & m.xlen_mask)
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def _execute_subbx(self, m):
+        b = m.get_reg_unchecked(self.rs2) > m.get_reg_unchecked(self.rs1)
+        res = m.get_reg_unchecked(self.rs1) - self.get_rs2_op(m) - int(m.get_flag('XC'))
+        m.set_flag('XC', b)
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        m.setx_z_m_l(res & m.xlen_mask)
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def translate(self, b):
+        mnem = self.MNEM.get(self.fun)
+        if mnem is None:
+            return False
+        x = mnem in ('subx', 'subbx')
+        borrow = b.tmp(b.reg(self.rs2) + ' > ' + b.reg(self.rs1))
+        if mnem == 'subi':
+            res = b.tmp('(' + b.reg(self.rs1) + ' - ' + str(self.imm) + ') & ' + str(b.xlen_mask))
+        elif mnem in ('sub', 'subx'):
+            res = b.tmp('(' + b.reg(self.rs1) + ' - ' + self.translate_rs2_op(b) + ') & ' + str(b.xlen_mask))
         else:
-            raise Exception('Invalid opcode')
-        m.set_reg(self.rd, res & m.xlen_mask)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+            res = b.tmp('(' + b.reg(self.rs1) + ' - ' + self.translate_rs2_op(b) + ' - ' + b.flag('XC' if x else 'C')
+                        + ') & ' + str(b.xlen_mask))
+        b.set_flag('XC' if x else 'C', borrow)
+        b.set_z_m_l(res, x)
+        b.set_reg(self.rd, res)
+        return True
 
 
 class ISubm(GIStdShift):
@@ -981,16 +1099,24 @@ class ISubm(GIStdShift):
 
     zero_ranges = [(7, 0)]  # disallow shifting for now
 
+    __slots__ = ()
+
     def execute(self, m):
         if self.shift_right:
-            rs2op = (m.get_reg(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
+            rs2op = (m.get_reg_unchecked(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
         else:
-            rs2op = (m.get_reg(self.rs2) << self.shift_bytes*8) & m.xlen_mask
-        res = (m.get_reg(self.rs1) - rs2op) % m.get_reg('mod')
+            rs2op = (m.get_reg_unchecked(self.rs2) << self.shift_bytes*8) & m.xlen_mask
+        res = (m.get_reg_unchecked(self.rs1) - rs2op) % m.get_reg('mod')
         m.set_z_m_l(res & m.xlen_mask)
-        m.set_reg(self.rd, res & m.xlen_mask)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def translate(self, b):
+        res = b.tmp('((' + b.reg(self.rs1) + ' - ' + self.translate_rs2_op(b) + ') % ' + b.sreg('mod') + ') & '
+                    + str(b.xlen_mask))
+        b.set_z_m_l(res)
+        b.set_reg(self.rd, res)
+        return True
 
 
 class IMul128(GIStd):
@@ -1005,8 +1131,7 @@ class IMul128(GIStd):
 
     CYCLES = 4
 
-    r1_upper = 0
-    r2_upper = 0
+    __slots__ = ('r1_upper', 'r2_upper')
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -1048,12 +1173,19 @@ class IMul128(GIStd):
         return cls(ret, ctx.ins_ctx)
 
     def execute(self, m):
-        op1 = (m.get_reg(self.rs1) >> int(m.XLEN/2)*int(self.r1_upper)) & m.half_xlen_mask
-        op2 = (m.get_reg(self.rs2) >> int(m.XLEN/2)*int(self.r2_upper)) & m.half_xlen_mask
+        op1 = (m.get_reg_unchecked(self.rs1) >> m.half_xlen*int(self.r1_upper)) & m.half_xlen_mask
+        op2 = (m.get_reg_unchecked(self.rs2) >> m.half_xlen*int(self.r2_upper)) & m.half_xlen_mask
         res = op1*op2
-        m.set_reg(self.rd, res)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        m.set_reg_unchecked(self.rd, res)
+        return False
+
+    def translate(self, b):
+        op1 = '((' + b.reg(self.rs1) + ' >> ' + str(int(b.xlen/2)*int(self.r1_upper)) + ') & '\
+              + str(b.half_xlen_mask) + ')'
+        op2 = '((' + b.reg(self.rs2) + ' >> ' + str(int(b.xlen/2)*int(self.r2_upper)) + ') & '\
+              + str(b.half_xlen_mask) + ')'
+        b.set_reg(self.rd, op1 + ' * ' + op2)
+        return True
 
 
 #############################################
@@ -1068,16 +1200,23 @@ class IAnd(GIStdShift):
 
     zero_ranges = []
 
+    __slots__ = ()
+
     def execute(self, m):
         if self.shift_right:
-            rs2op = (m.get_reg(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
+            rs2op = (m.get_reg_unchecked(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
         else:
-            rs2op = (m.get_reg(self.rs2) << self.shift_bytes*8) & m.xlen_mask
-        res = m.get_reg(self.rs1) & rs2op
+            rs2op = (m.get_reg_unchecked(self.rs2) << self.shift_bytes*8) & m.xlen_mask
+        res = m.get_reg_unchecked(self.rs1) & rs2op
         m.set_z_m_l(res)
-        m.set_reg(self.rd, res)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        m.set_reg_unchecked(self.rd, res)
+        return False
+
+    def translate(self, b):
+        res = b.tmp(b.reg(self.rs1) + ' & ' + self.translate_rs2_op(b))
+        b.set_z_m_l(res)
+        b.set_reg(self.rd, res)
+        return True
 
 
 class IOr(GIStdShift):
@@ -1088,16 +1227,23 @@ class IOr(GIStdShift):
 
     zero_ranges = []
 
+    __slots__ = ()
+
     def execute(self, m):
         if self.shift_right:
-            rs2op = (m.get_reg(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
+            rs2op = (m.get_reg_unchecked(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
         else:
-            rs2op = (m.get_reg(self.rs2) << self.shift_bytes*8) & m.xlen_mask
-        res = m.get_reg(self.rs1) | rs2op
+            rs2op = (m.get_reg_unchecked(self.rs2) << self.shift_bytes*8) & m.xlen_mask
+        res = m.get_reg_unchecked(self.rs1) | rs2op
         m.set_z_m_l(res)
-        m.set_reg(self.rd, res)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        m.set_reg_unchecked(self.rd, res)
+        return False
+
+    def translate(self, b):
+        res = b.tmp(b.reg(self.rs1) + ' | ' + self.translate_rs2_op(b))
+        b.set_z_m_l(res)
+        b.set_reg(self.rd, res)
+        return True
 
 
 class INot(GIStdShift):
@@ -1108,6 +1254,8 @@ class INot(GIStdShift):
 
     zero_ranges = [GIStd.RS1_RANGE]
 
+    __slots__ = ()
+
     def get_asm_str(self):
         rs = self.rs2
         asm_str = self.MNEM.get(self.fun) + ' r' + str(self.rd) + ', r' + str(rs)
@@ -1122,14 +1270,19 @@ class INot(GIStdShift):
 
     def execute(self, m):
         if self.shift_right:
-            rsop = (m.get_reg(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
+            rsop = (m.get_reg_unchecked(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
         else:
-            rsop = (m.get_reg(self.rs2) << self.shift_bytes*8) & m.xlen_mask
+            rsop = (m.get_reg_unchecked(self.rs2) << self.shift_bytes*8) & m.xlen_mask
         res = ~rsop & m.xlen_mask
         m.set_z_m_l(res)
-        m.set_reg(self.rd, res)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        m.set_reg_unchecked(self.rd, res)
+        return False
+
+    def translate(self, b):
+        res = b.tmp('~' + self.translate_rs2_op(b) + ' & ' + str(b.xlen_mask))
+        b.set_z_m_l(res)
+        b.set_reg(self.rd, res)
+        return True
 
 
 class IXor(GIStdShift):
@@ -1140,16 +1293,23 @@ class IXor(GIStdShift):
 
     zero_ranges = []
 
+    __slots__ = ()
+
     def execute(self, m):
         if self.shift_right:
-            rs2op = (m.get_reg(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
+            rs2op = (m.get_reg_unchecked(self.rs2) >> self.shift_bytes*8) & m.xlen_mask
         else:
-            rs2op = (m.get_reg(self.rs2) << self.shift_bytes*8) & m.xlen_mask
-        res = m.get_reg(self.rs1) ^ rs2op
+            rs2op = (m.get_reg_unchecked(self.rs2) << self.shift_bytes*8) & m.xlen_mask
+        res = m.get_reg_unchecked(self.rs1) ^ rs2op
         m.set_z_m_l(res & m.xlen_mask)
-        m.set_reg(self.rd, res & m.xlen_mask)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        m.set_reg_unchecked(self.rd, res & m.xlen_mask)
+        return False
+
+    def translate(self, b):
+        res = b.tmp(b.reg(self.rs1) + ' ^ ' + self.translate_rs2_op(b))
+        b.set_z_m_l(res)
+        b.set_reg(self.rd, res)
+        return True
 
 
 class ISel(GIStd):
@@ -1165,9 +1325,14 @@ class ISel(GIStd):
 
     zero_ranges = []
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
+    def get_mnem(self):
+        return self.MNEM.get((self.fun, self.imm))
+
     def get_asm_str(self):
         asm_str = self.MNEM.get((self.fun, self.imm)) + ' r' + str(self.rd) + ', r'\
                   + str(self.rs1) + ', r' + str(self.rs2)
@@ -1192,26 +1357,39 @@ class ISel(GIStd):
         ret += cls.enc_op(cls.OP)
         return cls(ret, ctx.ins_ctx)
 
-    def execute(self, m):
-        if self.MNEM.get((self.fun, self.imm)) == 'sell':
-            sel = m.get_flag('L')
-        elif self.MNEM.get((self.fun, self.imm)) == 'selm':
-            sel = m.get_flag('M')
-        elif self.MNEM.get((self.fun, self.imm)) == 'selc':
-            sel = m.get_flag('C')
-        elif self.MNEM.get((self.fun, self.imm)) == 'sellx':
-            sel = m.get_flag('XL')
-        elif self.MNEM.get((self.fun, self.imm)) == 'selcx':
-            sel = m.get_flag('XC')
-        else:
-            raise Exception('Invalid opcode')
+    def bind_execute(self):
+        self.execute = self.get_handler(self.MNEM.get((self.fun, self.imm)))
+
+    def select(self, m, sel):
         if sel:
-            m.set_reg(self.rd, m.get_reg(self.rs1))
+            m.set_reg_unchecked(self.rd, m.get_reg_unchecked(self.rs1))
         else:
-            m.set_reg(self.rd, m.get_reg(self.rs2))
+            m.set_reg_unchecked(self.rd, m.get_reg_unchecked(self.rs2))
+
+        return False
+
+    def _execute_sell(self, m):
+        return self.select(m, m.get_flag('L'))
 
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+    def _execute_selm(self, m):
+        return self.select(m, m.get_flag('M'))
+
+    def _execute_selc(self, m):
+        return self.select(m, m.get_flag('C'))
+
+    def _execute_sellx(self, m):
+        return self.select(m, m.get_flag('XL'))
+
+    def _execute_selcx(self, m):
+        return self.select(m, m.get_flag('XC'))
+
+    def translate(self, b):
+        flag = {'sell': 'L', 'selm': 'M', 'selc': 'C', 'sellx': 'XL', 'selcx': 'XC'}.get(
+            self.MNEM.get((self.fun, self.imm)))
+        if flag is None:
+            return False
+        b.set_reg(self.rd, b.reg(self.rs1) + ' if ' + b.flag(flag) + ' else ' + b.reg(self.rs2))
+        return True
 
 
 class IRshi(GIStd):
@@ -1222,6 +1400,8 @@ class IRshi(GIStd):
 
     zero_ranges = []
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
@@ -1253,20 +1433,28 @@ class IRshi(GIStd):
         return cls(ret, ctx.ins_ctx)
 
     def execute(self, m):
-        conc = (m.get_reg(self.rs2) << m.XLEN) + m.get_reg(self.rs1)
+        conc = (m.get_reg_unchecked(self.rs2) << m.XLEN) + m.get_reg_unchecked(self.rs1)
         res = (conc >> self.imm) & m.xlen_mask
-        m.set_reg(self.rd, res)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        m.set_reg_unchecked(self.rd, res)
+        return False
+
+    def translate(self, b):
+        b.set_reg(self.rd, '(((' + b.reg(self.rs2) + ' << ' + str(b.xlen) + ') + ' + b.reg(self.rs1) + ') >> '
+                  + str(self.imm) + ') & ' + str(b.xlen_mask))
+        return True
 
 
 class ICmp(GIStd):
     """Compare Instructions (2rs)"""
     MNEM = {0: 'cmp', 5: 'cmpbx'}
+    # Flag group accessed by each mnemonic (for the statistics)
+    FLAG_GROUPS = {'cmp': 'n', 'cmpbx': 'x'}
     OP = 0b010111
 
     zero_ranges = [GIStd.RD_RANGE, GIStd.IMM_RANGE]
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
@@ -1290,29 +1478,48 @@ class ICmp(GIStd):
         ret += cls.enc_fun(cls.get_bin_for_mnem(mnem))
         return cls(ret, ctx.ins_ctx)
 
-    def execute(self, m):
-        if self.MNEM.get(self.fun) == 'cmp':
-            m.stat_record_flag_access('n', self.MNEM.get(self.fun))
-            if m.get_reg(self.rs2) == m.get_reg(self.rs1):
-                m.set_flag('Z', True)
-            else:
-                m.set_flag('Z', False)
-            if m.get_reg(self.rs2) > m.get_reg(self.rs1):
-                m.set_flag('C', True)
-            else:
-                m.set_flag('C', False)
-        elif self.MNEM.get(self.fun) == 'cmpbx':
-            m.stat_record_flag_access('x', self.MNEM.get(self.fun))
-            if m.get_reg(self.rs2) > m.get_reg(self.rs1):
-                m.set_flag('XC', True)
-            if m.get_reg(self.rs2) < m.get_reg(self.rs1):
-                m.set_flag('XC', False)
-            # if rs1 and rs2 are equal XC is left unchanged
+    def bind_execute(self):
+        self.execute = self.get_handler(self.MNEM.get(self.fun))
+
+    def record_stats(self, stats):
+        mnem = self.MNEM.get(self.fun)
+        if mnem is not None:
+            stats.record_flag_access(self.FLAG_GROUPS[mnem], mnem)
+
+    def _execute_cmp(self, m):
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        if m.get_reg_unchecked(self.rs2) == m.get_reg_unchecked(self.rs1):
+            m.set_flag('Z', True)
+        else:
+            m.set_flag('Z', False)
+        if m.get_reg_unchecked(self.rs2) > m.get_reg_unchecked(self.rs1):
+            m.set_flag('C', True)
         else:
-            raise Exception('Invalid opcode')
+            m.set_flag('C', False)
+        return False
 
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+    def _execute_cmpbx(self, m):
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        if m.get_reg_unchecked(self.rs2) > m.get_reg_unchecked(self.rs1):
+            m.set_flag('XC', True)
+        if m.get_reg_unchecked(self.rs2) < m.get_reg_unchecked(self.rs1):
+            m.set_flag('XC', False)
+        # if rs1 and rs2 are equal XC is left unchanged
+        return False
+
+    def translate(self, b):
+        mnem = self.MNEM.get(self.fun)
+        if mnem == 'cmp':
+            b.set_flag('Z', b.reg(self.rs2) + ' == ' + b.reg(self.rs1))
+            b.set_flag('C', b.reg(self.rs2) + ' > ' + b.reg(self.rs1))
+        elif mnem == 'cmpbx':
+            b.set_flag('XC', 'True if ' + b.reg(self.rs2) + ' > ' + b.reg(self.rs1) + ' else (False if '
+                       + b.reg(self.rs2) + ' < ' + b.reg(self.rs1) + ' else ' + b.flag('XC') + ')')
+        else:
+            return False
+        return True
 
 
 #############################################
@@ -1326,6 +1533,8 @@ class ILdSt1(GIStd):
 
     zero_ranges = [GIStd.RS2_RANGE, GIStd.IMM_RANGE]
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
@@ -1370,21 +1579,39 @@ class ILdSt1(GIStd):
         ret += cls.enc_fun(cls.get_bin_for_mnem(mnem))
         return cls(ret, ctx.ins_ctx)
 
-    def execute(self, m):
-        if self.MNEM.get(self.fun) == 'ldrfp':
-            m.set_reg('rfp', m.get_reg(self.rs1))
-        elif self.MNEM.get(self.fun) == 'ldlc':
-            m.set_reg('lc', m.get_reg(self.rs1))
-        elif self.MNEM.get(self.fun) == 'lddmp':
-            m.set_reg('dmp', m.get_reg(self.rs1))
-        elif self.MNEM.get(self.fun) == 'lddrp':
-            m.set_reg('drp', m.get_reg(self.rs1))
-        elif self.MNEM.get(self.fun) == 'stdmp':
-            m.set_reg(self.rd, m.get_reg('dmp'))
+    def bind_execute(self):
+        self.execute = self.get_handler(self.MNEM.get(self.fun))
+
+    def _execute_ldrfp(self, m):
+        m.set_reg('rfp', m.get_reg(self.rs1))
+        return False
+
+    def _execute_ldlc(self, m):
+        m.set_reg('lc', m.get_reg(self.rs1))
+        return False
+
+    def _execute_lddmp(self, m):
+        m.set_reg('dmp', m.get_reg(self.rs1))
+        return False
+
+    def _execute_lddrp(self, m):
+        m.set_reg('drp', m.get_reg(self.rs1))
+        return False
+
+    def _execute_stdmp(self, m):
+        m.set_reg(self.rd, m.get_reg('dmp'))
+        return False
+
+    def translate(self, b):
+        mnem = self.MNEM.get(self.fun)
+        if mnem == 'stdmp':
+            b.set_reg(self.rd, b.sreg('dmp'))
+        elif mnem in ('ldrfp', 'ldlc', 'lddmp'):
+            b.set_sreg(mnem[2:], b.reg(self.rs1))
         else:
-            raise Exception('Invalid opcode')
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+            # lddrp raises in the interpreter
+            return False
+        return True
 
 
 class ILdSt2(GIStd):
@@ -1394,6 +1621,8 @@ class ILdSt2(GIStd):
 
     zero_ranges = [GIStd.RS2_RANGE, GIStd.IMM_RANGE]
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
@@ -1439,19 +1668,34 @@ class ILdSt2(GIStd):
         ret += cls.enc_fun(cls.get_bin_for_mnem(mnem))
         return cls(ret, ctx.ins_ctx)
 
-    def execute(self, m):
-        if self.MNEM.get(self.fun) == 'ldmod':
-            m.set_reg('mod', m.get_reg(self.rs1))
-        elif self.MNEM.get(self.fun) == 'ldrnd':
-            m.set_reg('rnd', m.get_reg(self.rs1))
-        elif self.MNEM.get(self.fun) == 'stmod':
-            m.set_reg(self.rd, m.get_reg('mod'))
-        elif self.MNEM.get(self.fun) == 'strnd':
-            m.set_reg(self.rd, m.get_reg('rnd'))
+    def bind_execute(self):
+        self.execute = self.get_handler(self.MNEM.get(self.fun))
+
+    def _execute_ldmod(self, m):
+        m.set_reg('mod', m.get_reg(self.rs1))
+        return False
+
+    def _execute_ldrnd(self, m):
+        m.set_reg('rnd', m.get_reg(self.rs1))
+        return False
+
+    def _execute_stmod(self, m):
+        m.set_reg(self.rd, m.get_reg('mod'))
+        return False
+
+    def _execute_strnd(self, m):
+        m.set_reg(self.rd, m.get_reg('rnd'))
+        return False
+
+    def translate(self, b):
+        mnem = self.MNEM.get(self.fun)
+        if mnem in ('stmod', 'strnd'):
+            b.set_reg(self.rd, b.sreg(mnem[2:]))
+        elif mnem in ('ldmod', 'ldrnd'):
+            b.set_sreg(mnem[2:], b.reg(self.rs1))
         else:
-            raise Exception('Invalid opcode')
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+            return False
+        return True
 
 
 class ILdi(GIWideImm):
@@ -1463,7 +1707,7 @@ class ILdi(GIWideImm):
     MNEM = 'ldi'
     OP = 0b100001
 
-    idx = 0
+    __slots__ = ('idx',)
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -1508,8 +1752,11 @@ class ILdi(GIWideImm):
 
     def execute(self, m):
         m.set_reg(self.rd, m.get_dmem(self.idx))
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        return False
+
+    def translate(self, b):
+        b.set_reg(self.rd, 'm.get_dmem(' + str(self.idx) + ', ' + str(b.addr) + ')')
+        return True
 
 
 class ISti(GIWideImm):
@@ -1521,7 +1768,7 @@ class ISti(GIWideImm):
     MNEM = 'sti'
     OP = 0b100010
 
-    idx = 0
+    __slots__ = ('idx',)
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -1566,8 +1813,11 @@ class ISti(GIWideImm):
 
     def execute(self, m):
         m.set_dmem(self.idx, m.get_reg(self.rd))
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        return False
+
+    def translate(self, b):
+        b.emit('m.set_dmem(' + str(self.idx) + ', ' + b.reg(self.rd) + ')')
+        return True
 
 
 class IMovLdr(GIStd):
@@ -1577,13 +1827,7 @@ class IMovLdr(GIStd):
 
     zero_ranges = [GIStd.RS2_RANGE, GIStd.IMM_RANGE]
 
-    rs = 0
-    rs_dmem = 0
-    rs_inc = 0
-    rs_limb = 0
-    rd_dmem = 0
-    rd_inc = 0
-    rd_limb = 0
+    __slots__ = ('rs', 'rs_dmem', 'rs_inc', 'rs_limb', 'rd_dmem', 'rd_inc', 'rd_limb')
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -1591,6 +1835,8 @@ class IMovLdr(GIStd):
     def dec(self):
         super().dec()
         self.rs = self.rs1
+        self.rs_dmem, self.rs_inc, self.rs_limb = 0, 0, 0
+        self.rd_dmem, self.rd_inc, self.rd_limb = 0, 0, 0
         if self.MNEM.get(self.fun) == 'ldr':
             self.rs_dmem, self.rs_inc, self.rs_limb = self.reg_as_limb(self.rs)
             self.rd_dmem, self.rd_inc, self.rd_limb = self.reg_as_limb(self.rd)
@@ -1645,25 +1891,47 @@ class IMovLdr(GIStd):
         ret += cls.enc_fun(cls.get_bin_for_mnem(mnem))
         return cls(ret, ctx.ins_ctx)
 
-    def execute(self, m):
-        if self.MNEM.get(self.fun) == 'mov':
-            m.set_reg(self.rd, m.get_reg(self.rs))
-        elif self.MNEM.get(self.fun) == 'ldr':
-            sptr = m.get_reg_limb('rfp', self.rs_limb) & m.reg_idx_mask
-            dptr = m.get_reg_limb('rfp', self.rd_limb) & m.reg_idx_mask
-            m.set_reg(dptr, m.get_reg(sptr))
+    def bind_execute(self):
+        self.execute = self.get_handler(self.MNEM.get(self.fun))
+
+    def record_stats(self, stats):
+        if self.MNEM.get(self.fun) == 'ldr':
+            stats.record_wide_mem_op('ldr', self.rs_inc, self.rd_inc)
+
+    def _execute_mov(self, m):
+        m.set_reg_unchecked(self.rd, m.get_reg_unchecked(self.rs))
+        return False
+
+    def _execute_ldr(self, m):
+        sptr = m.get_reg_limb('rfp', self.rs_limb) & m.reg_idx_mask
+        dptr = m.get_reg_limb('rfp', self.rd_limb) & m.reg_idx_mask
+        m.set_reg(dptr, m.get_reg(sptr))
+        if self.rs_inc:
+            sptr += 1 % m.NUM_REGS
+            m.set_reg_limb('rfp', self.rs_limb, sptr)
+        if self.rd_inc:
+            dptr += 1 % m.NUM_REGS
+            m.set_reg_limb('rfp', self.rd_limb, dptr)
+
+        if m.stats is not None:
+            self.record_stats(m.stats)
+        return False
+
+    def translate(self, b):
+        mnem = self.MNEM.get(self.fun)
+        if mnem == 'mov':
+            b.set_reg(self.rd, b.reg(self.rs))
+        elif mnem == 'ldr':
+            sptr = b.tmp(b.get_limb('rfp', self.rs_limb) + ' & ' + str(b.reg_idx_mask))
+            dptr = b.tmp(b.get_limb('rfp', self.rd_limb) + ' & ' + str(b.reg_idx_mask))
+            b.set_reg_dyn(dptr, b.get_reg_dyn(sptr))
             if self.rs_inc:
-                sptr += 1 % m.NUM_REGS
-                m.set_reg_limb('rfp', self.rs_limb, sptr)
+                b.set_limb('rfp', self.rs_limb, sptr + ' + 1')
             if self.rd_inc:
-                dptr += 1 % m.NUM_REGS
-                m.set_reg_limb('rfp', self.rd_limb, dptr)
-
-            m.stat_record_wide_mem_op('ldr', self.rs_inc, self.rd_inc)
+                b.set_limb('rfp', self.rd_limb, dptr + ' + 1')
         else:
-            raise Exception('InvalidOpcode')
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+            return False
+        return True
 
 
 class IMovi(GIWideImm):
@@ -1676,7 +1944,7 @@ class IMovi(GIWideImm):
 
     zero_ranges = []
 
-    slice = 0
+    __slots__ = ('slice',)
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -1713,11 +1981,22 @@ class IMovi(GIWideImm):
         ret += cls.enc_op(cls.OP)
         return cls(ret, ctx.ins_ctx)
 
+    def record_stats(self, stats):
+        stats.record_movi(self.imm.bit_length())
+
     def execute(self, m):
-        m.stat_record_movi(self.imm.bit_length())
+        if m.stats is not None:
+            self.record_stats(m.stats)
         m.set_reg_half_limb(self.rd, self.fun, self.imm, self.slice)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        return False
+
+    def translate(self, b):
+        if self.fun >= b.limbs or self.imm > b.half_limb_mask:
+            return False
+        pos = (self.fun * 2 + bool(self.slice)) * b.half_limb_width
+        b.set_reg(self.rd, '(' + b.reg(self.rd) + ' & ' + str(b.xlen_mask ^ (b.half_limb_mask << pos)) + ') | '
+                  + str(self.imm << pos))
+        return True
 
 
 class ISt(GIStd):
@@ -1727,12 +2006,7 @@ class ISt(GIStd):
 
     zero_ranges = [GIStd.RS2_RANGE, GIStd.IMM_RANGE]
 
-    dmem_dst = 0
-    inc_dst = 0
-    limb_dst = 0
-    dmem_src = 0
-    inc_src = 0
-    limb_src = 0
+    __slots__ = ('dmem_dst', 'inc_dst', 'limb_dst', 'dmem_src', 'inc_src', 'limb_src')
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -1776,6 +2050,9 @@ class ISt(GIStd):
         ret += cls.enc_op(cls.OP)
         return cls(ret, ctx.ins_ctx)
 
+    def record_stats(self, stats):
+        stats.record_wide_mem_op('st', self.inc_src, self.inc_dst)
+
     def execute(self, m):
         sptr = m.get_reg_limb('rfp', self.limb_src) & m.reg_idx_mask
         dptr = m.get_reg_limb('dmp', self.limb_dst) & m.dmem_idx_mask
@@ -1786,11 +2063,21 @@ class ISt(GIStd):
         if self.inc_dst:
             dptr += 1 % m.DMEM_DEPTH
             m.set_reg_limb('dmp', self.limb_dst, dptr)
-        trace_str = self.get_asm_str()[1]
 
-        m.stat_record_wide_mem_op('st', self.inc_src, self.inc_dst)
+        if m.stats is not None:
+            self.record_stats(m.stats)
 
-        return trace_str, False
+        return False
+
+    def translate(self, b):
+        sptr = b.tmp(b.get_limb('rfp', self.limb_src) + ' & ' + str(b.reg_idx_mask))
+        dptr = b.tmp(b.get_limb('dmp', self.limb_dst) + ' & ' + str(b.dmem_idx_mask))
+        b.set_dmem(dptr, b.get_reg_dyn(sptr))
+        if self.inc_src:
+            b.set_limb('rfp', self.limb_src, sptr + ' + 1')
+        if self.inc_dst:
+            b.set_limb('dmp', self.limb_dst, dptr + ' + 1')
+        return True
 
 
 class ILd(GIStd):
@@ -1800,12 +2087,7 @@ class ILd(GIStd):
 
     zero_ranges = [GIStd.RS2_RANGE, GIStd.IMM_RANGE]
 
-    dmem_dst = 0
-    inc_dst = 0
-    limb_dst = 0
-    dmem_src = 0
-    inc_src = 0
-    limb_src = 0
+    __slots__ = ('dmem_dst', 'inc_dst', 'limb_dst', 'dmem_src', 'inc_src', 'limb_src')
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -1817,6 +2099,9 @@ class ILd(GIStd):
         if self.dmem_src == self.dmem_dst:
             self.malformed = True
 
+    def get_mnem(self):
+        return self.MNEM.get(self.dmem_src)
+
     def get_asm_str(self):
         asm_str = ''
         asm_str += self.MNEM.get(self.dmem_src) + ' *' + str(self.limb_dst)
@@ -1855,6 +2140,9 @@ class ILd(GIStd):
         ret += cls.enc_op(cls.OP)
         return cls(ret, ctx.ins_ctx)
 
+    def record_stats(self, stats):
+        stats.record_wide_mem_op('ld', self.inc_src, self.inc_dst)
+
     def execute(self, m):
         sptr = m.get_reg_limb('dmp', self.limb_src) & m.dmem_idx_mask
         dptr = m.get_reg_limb('rfp', self.limb_dst) & m.reg_idx_mask
@@ -1865,12 +2153,22 @@ class ILd(GIStd):
         if self.inc_dst:
             dptr += 1 % m.NUM_REGS
             m.set_reg_limb('rfp', self.limb_dst, dptr)
-        trace_str = self.get_asm_str()[1]
 
         # XXX: assert on ldc
-        m.stat_record_wide_mem_op('ld', self.inc_src, self.inc_dst)
+        if m.stats is not None:
+            self.record_stats(m.stats)
 
-        return trace_str, False
+        return False
+
+    def translate(self, b):
+        sptr = b.tmp(b.get_limb('dmp', self.limb_src) + ' & ' + str(b.dmem_idx_mask))
+        dptr = b.tmp(b.get_limb('rfp', self.limb_dst) + ' & ' + str(b.reg_idx_mask))
+        b.set_reg_dyn(dptr, b.get_dmem(sptr))
+        if self.inc_src:
+            b.set_limb('dmp', self.limb_src, sptr + ' + 1')
+        if self.inc_dst:
+            b.set_limb('rfp', self.limb_dst, dptr + ' + 1')
+        return True
 
 
 #############################################
@@ -1882,6 +2180,8 @@ class INop(GIStdNoParm):
     MNEM = {0: 'nop'}
     OP = 0b111111
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
@@ -1893,8 +2193,10 @@ class INop(GIStdNoParm):
         return cls(ret, ctx.ins_ctx)
 
     def execute(self, m):
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        return False
+
+    def translate(self, b):
+        return True
 
 
 class ISigini(GIStd):
@@ -1904,6 +2206,8 @@ class ISigini(GIStd):
 
     zero_ranges = [Ins.FUN_RANGE, GIStd.RD_RANGE, GIStd.RS2_RANGE, GIStd.RS1_RANGE]
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
@@ -1925,8 +2229,10 @@ class ISigini(GIStd):
         return cls(ret, ctx.ins_ctx)
 
     def execute(self, m):
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+        return False
+
+    def translate(self, b):
+        return True
 
 
 #############################################
@@ -1938,6 +2244,8 @@ class IRet(GIStdNoParm):
     MNEM = {0: 'ret'}
     OP = 0b000011
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
@@ -1959,8 +2267,7 @@ class IRet(GIStdNoParm):
                 m.finish()
                 ret_addr = m.get_pc()
 
-        trace_str = self.get_asm_str()[1]
-        return trace_str, ret_addr
+        return ret_addr
 
 
 class ICall(GIMidImm):
@@ -1969,6 +2276,8 @@ class ICall(GIMidImm):
 
     ZERO_RANGES = [Ins.FUN_RANGE, GIMidImm.FUNB_RANGE]
 
+    __slots__ = ()
+
     def get_asm_str(self):
         addr = self.imm
         asm_str = self.MNEM.get(self.fun) + ' &' + self.ctx.get_or_add_function(addr)
@@ -1989,12 +2298,12 @@ class ICall(GIMidImm):
         return cls(ret, ctx.ins_ctx)
 
     def execute(self, m):
-        m.stat_record_func_call(call_site = m.pc, callee_func = self.imm)
+        if m.stats is not None:
+            m.stats.record_func_call(m.pc, m.get_func_addr_for_pc(m.pc), self.imm)
 
         m.push_call_stack(m.get_pc())
 
-        trace_str = self.get_asm_str()[1]
-        return trace_str, self.imm
+        return self.imm
 
 
 class IBranch(GIMidImm):
@@ -2008,9 +2317,14 @@ class IBranch(GIMidImm):
 
     zero_ranges = [Ins.FUN_RANGE]
 
+    __slots__ = ()
+
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
 
+    def get_mnem(self):
+        return self.MNEM.get(self.funb)
+
     def get_asm_str(self):
         addr = self.imm
         asm_str = self.MNEM.get(self.funb) + ' ' + self.ctx.get_or_add_label(addr)
@@ -2032,23 +2346,31 @@ class IBranch(GIMidImm):
         ret += cls.enc_op(cls.OP)
         return cls(ret, ctx.ins_ctx)
 
-    def execute(self, m):
-        trace_str = self.get_asm_str()[1]
-        if self.MNEM.get(self.funb) == 'bl':
-            branch = m.get_flag('L')
-        elif self.MNEM.get(self.funb) == 'bnc':
-            branch = not m.get_flag('C')
-        elif self.MNEM.get(self.funb) == 'b':
-            branch = True
-        elif self.MNEM.get(self.funb) == 'bnz':
-            branch = not m.get_flag('Z')
-        elif self.MNEM.get(self.funb) == 'bz':
-            branch = m.get_flag('Z')
-        else:
-            raise Exception('Invalid opcode')
-        if branch:
-            return trace_str, self.imm
-        return trace_str, False
+    def bind_execute(self):
+        self.execute = self.get_handler(self.MNEM.get(self.funb))
+
+    def _execute_bl(self, m):
+        if m.get_flag('L'):
+            return self.imm
+        return False
+
+    def _execute_bnc(self, m):
+        if not m.get_flag('C'):
+            return self.imm
+        return False
+
+    def _execute_b(self, m):
+        return self.imm
+
+    def _execute_bnz(self, m):
+        if not m.get_flag('Z'):
+            return self.imm
+        return False
+
+    def _execute_bz(self, m):
+        if m.get_flag('Z'):
+            return self.imm
+        return False
 
 
 class ILoop(GIMidImm):
@@ -2066,9 +2388,7 @@ class ILoop(GIMidImm):
 
     zero_ranges = [(23, 23)]
 
-    len = 0
-    cnt = 0
-    limb = 0
+    __slots__ = ('len', 'cnt', 'limb')
 
     def __init__(self, ins, ctx):
         super().__init__(ins, ctx)
@@ -2076,6 +2396,9 @@ class ILoop(GIMidImm):
     def dec(self):
         super().dec()
         self.len = self.imm
+        # number of iterations of the direct case, the indirect case reads it from lc when executed
+        self.cnt = 0
+        self.limb = 0
         if self.fun == self.FUN_DIRECT:  # pound/direct case
             self.cnt = self.funb
         elif self.fun == self.FUN_INDIRECT:  # star/indirect case
@@ -2150,13 +2473,59 @@ class ILoop(GIMidImm):
         ret += cls.enc_op(cls.OP)
         return cls(ret, ctx.ins_ctx)
 
-    def execute(self, m):
+    def get_iterations(self, m):
+        """Get the number of loop iterations (from the immediate or from the lc limb)"""
         if self.fun == self.FUN_INDIRECT:  # star/indirect case
-            self.cnt = m.get_reg_limb('lc', self.limb)
-        m.push_loop_stack(self.cnt-1, self.len+m.get_pc(), m.get_pc()+1)
-        m.stat_record_loop(m.get_pc(), self.len, len(m.loop_stack), self.cnt)
-        trace_str = self.get_asm_str()[1]
-        return trace_str, False
+            return m.get_reg_limb('lc', self.limb)
+        return self.cnt
+
+    def execute(self, m):
+        cnt = self.get_iterations(m)
+        m.push_loop_stack(cnt-1, self.len+m.get_pc(), m.get_pc()+1)
+        if m.stats is not None:
+            m.stats.record_loop(m.get_pc(), self.len, len(m.loop_stack), cnt)
+        return False
+
+
+def _register_mnemonics(class_p, mnem_map):
+    """ Find all final classes derived from Ins and append their mnemonic and class type to dictionary"""
+    for cls in class_p.__subclasses__():
+        if len(cls.__subclasses__()) > 0:
+            _register_mnemonics(cls, mnem_map)
+        else:
+            if isinstance(cls.MNEM, str):
+                if cls.MNEM in mnem_map:
+                    raise Exception('Error adding mnemonic \'' + cls.MNEM + '\' for class ' + cls.__name__
+                                    + '. Mnemonic already in use.')
+                mnem_map.update({cls.MNEM: cls})
+            elif isinstance(cls.MNEM, dict):
+                for item in cls.MNEM.values():
+                    if item in mnem_map:
+                        raise Exception('Error adding mnemonic \'' + item + '\' for class ' + cls.__name__
+                                        + '. Mnemonic already in use.')
+                    mnem_map.update({item: cls})
+            else:
+                raise Exception('Invalid mnemonic format for class ' + cls.__name__)
+
+
+def _register_opcodes(class_p, opcode_table):
+    for cls in class_p.__subclasses__():
+        if len(cls.__subclasses__()) > 0:
+            _register_opcodes(cls, opcode_table)
+        else:
+            opcode_table[cls.OP] = cls
+
+
+def _build_registry():
+    mnem_map = {}
+    _register_mnemonics(Ins, mnem_map)
+    opcode_table = [None] * 2 ** Ins.OP_LEN
+    _register_opcodes(Ins, opcode_table)
+    return MappingProxyType(mnem_map), tuple(opcode_table)
+
+
+# Read-only registry of all instruction classes by mnemonic and by opcode (indexed by ins >> Ins.OP_POS)
+MNEM_MAP, OPCODE_TABLE = _build_registry()
 
 
 if __name__ == "__main__":
@@ -3,14 +3,62 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import math
-from collections import Counter
+import mmap
+import struct
+
+from . dmem import ByteDmem, InitBitmap
 
 
 class CallStackUnderrun(OverflowError):
     pass
 
 
+class UninitializedDmemRead(Exception):
+    pass
+
+
+class MachineConfig(object):
+    """Geometry of a machine (see Machine.__init__())
+
+    Machines with different configurations can be used side by side in one process. The defaults match the
+    class constants of Machine."""
+
+    def __init__(self, num_regs=32, xlen=256, limbs=8, dmem_depth=128, imem_depth=1024, loop_stack_size=16,
+                 call_stack_size=16):
+        self.num_regs = num_regs
+        self.xlen = xlen
+        self.limbs = limbs
+        self.dmem_depth = dmem_depth
+        self.imem_depth = imem_depth
+        self.loop_stack_size = loop_stack_size
+        self.call_stack_size = call_stack_size
+
+
+class MachineSnapshot(object):
+    """Architectural state of a machine (see Machine.snapshot())
+
+    The state is held in tuples, so a snapshot can't be modified and can be restored any number of times. The
+    register and dmem values are immutable ints shared with the machine, taking a snapshot only copies the
+    references to them. With the byte dmem backend images of dmem and its init bitmap are kept instead."""
+
+    def __init__(self, m):
+        self.r = tuple(m.r)
+        self.r_valid_half_limbs = tuple(m.r_valid_half_limbs)
+        self.sregs = (m.mod, m.dmp, m.rfp, m.lc, m.rnd)
+        self.flags = m.flags
+        self.loop_stack = tuple(m.loop_stack)
+        self.call_stack = tuple(m.call_stack)
+        self.pc = m.pc
+        if m.byte_dmem:
+            self.dmem = m.dmem.get_image()
+            self.init_dmem = m.init_dmem.get_image()
+        else:
+            self.dmem = tuple(m.dmem)
+            self.init_dmem = tuple(m.init_dmem)
+
+
 class Machine(object):
+    # Default geometry, overridden per instance by a MachineConfig passed to __init__()
     NUM_REGS = 32
     XLEN = 256
     LIMBS = 8
@@ -20,14 +68,22 @@ class Machine(object):
     LOOP_STACK_SIZE = 16
     CALL_STACK_SIZE = 16
 
-    # breakpoints is dictionary with break addresses being keys and
-    # values are tuples of number of passes required and the pass counter
-    breakpoints = {}
-
-    # force break in later instruction, e.g. when single stepping
-    # Can consider the loop or callstack to allow finishing calls, loops, or step over
-    # Format (Forcebreak active, consider call stack, call stack, consider loop stack, loop stack)
-    force_break = (False, False, 0, False, 0)
+    # The flags are packed into a single integer (self.flags) holding the standard flag group in the lower
+    # and the extended flag group in the upper nibble
+    FLAG_POS = {'C': 0, 'Z': 1, 'M': 2, 'L': 3, 'XC': 4, 'XZ': 5, 'XM': 6, 'XL': 7}
+    XFLAG_SHIFT = 4
+    FLAGS_MASK = 0x0f
+    XFLAGS_MASK = 0xf0
+
+    # Binary checkpoint format (see save_checkpoint()). The header holds magic, version, XLEN, LIMBS, NUM_REGS,
+    # LOOP_STACK_SIZE, CALL_STACK_SIZE, number of dmem words, pc, stop address, flags, loop stack depth and call stack
+    # depth. It is followed by fixed size sections (all values little-endian):
+    # registers, special registers (mod, dmp, rfp, lc, rnd), register validity masks, loop stack entries (signed
+    # remaining count, end address, start address), call stack entries, dmem words and the dmem init bitmap
+    CHECKPOINT_MAGIC = b'OTBNSIM\0'
+    CHECKPOINT_VERSION = 1
+    CHECKPOINT_HEADER = struct.Struct('<8s12Q')
+    SREG_NAMES = ('mod', 'dmp', 'rfp', 'lc', 'rnd')
 
     def get_func_addr_for_pc(self, pc):
         """ Get the function base address for an arbitrary program counter address """
@@ -37,58 +93,26 @@ class Machine(object):
                 break
         return pc
 
-    def stat_record_instr(self, instr):
-        ins_str = (instr.get_asm_str()[1]).split(' ', 1)[0].strip() # There seems to be no nicer way?
-        if 'instruction_histo' not in self.stats:
-            self.stats['instruction_histo'] = Counter()
-        self.stats['instruction_histo'][ins_str] += 1
-
-    def stat_record_func_call(self, call_site, callee_func):
-        caller_func = self.get_func_addr_for_pc(call_site)
-
-        if 'func_calls' not in self.stats:
-            self.stats['func_calls'] = []
-
-        self.stats['func_calls'].append({
-            'call_site': call_site,
-            'caller_func': caller_func,
-            'callee_func': callee_func,
-        })
-
-    def stat_record_loop(self, loop_addr, loop_len, new_loop_stack_depth, iterations):
-        if 'loops' not in self.stats:
-            self.stats['loops'] = []
-        self.stats['loops'].append({
-            'loop_addr': loop_addr,
-            'loop_len': loop_len,
-            'new_loop_stack_depth': new_loop_stack_depth,
-            'iterations': iterations,
-        })
-
-    def stat_record_movi(self, imm_size):
-        if 'movi' not in self.stats:
-            self.stats['movi'] = Counter()
-        self.stats['movi'][imm_size] += 1
-
-    def stat_record_wide_mem_op(self, op, inc_src, inc_dst):
-        if 'wide_mem_ops' not in self.stats:
-            self.stats['wide_mem_ops'] = []
-        self.stats['wide_mem_ops'].append({
-            'op': op,
-            'inc_src': inc_src,
-            'inc_dst': inc_dst,
-        })
-
-    def stat_record_flag_access(self, flag_group, op):
-        if 'flag_access' not in self.stats:
-            self.stats['flag_access'] = []
-        self.stats['flag_access'].append({
-            'flag_group': flag_group,
-            'op': op,
-        })
-
-    def __init__(self, dmem, imem, s_addr=0, stop_addr=None, ctx=None):
+    def __init__(self, dmem, imem, s_addr=0, stop_addr=None, ctx=None, track_validity=True, byte_dmem=False,
+                 strict_dmem=False, config=None):
         self.finishFlag = False
+        # breakpoints is dictionary with break addresses being keys and
+        # values are tuples of number of passes required and the pass counter
+        self.breakpoints = {}
+        # force break in later instruction, e.g. when single stepping
+        # Can consider the loop or callstack to allow finishing calls, loops, or step over
+        # Format (Forcebreak active, consider call stack, call stack, consider loop stack, loop stack)
+        self.force_break = (False, False, 0, False, 0)
+        if config is None:
+            config = MachineConfig()
+        self.config = config
+        self.NUM_REGS = config.num_regs
+        self.XLEN = config.xlen
+        self.LIMBS = config.limbs
+        self.DMEM_DEPTH = config.dmem_depth
+        self.IMEM_DEPTH = config.imem_depth
+        self.LOOP_STACK_SIZE = config.loop_stack_size
+        self.CALL_STACK_SIZE = config.call_stack_size
         if self.XLEN % (self.LIMBS * 2):
             raise Exception('XLEN must be divisible by LIMBS*2')
         self.limb_width = int(self.XLEN / self.LIMBS)
@@ -96,41 +120,66 @@ class Machine(object):
         self.half_limb_width = int(self.XLEN / self.LIMBS / 2)
         self.half_limb_mask = 2 ** self.half_limb_width - 1
         self.xlen_mask = 2 ** self.XLEN - 1
-        self.half_xlen_mask = 2 ** int(self.XLEN / 2) - 1
+        self.half_xlen = self.XLEN // 2
+        self.half_xlen_mask = 2 ** self.half_xlen - 1
+        self.word_bytes = self.XLEN // 8
+        self.valid_bytes = (self.LIMBS * 2 + 7) // 8
+        self.msb_pos = self.XLEN - 1
         self.reg_idx_width = int(math.ceil(math.log2(self.NUM_REGS)))
         self.reg_idx_mask = 2 ** self.reg_idx_width - 1
         self.dmem_idx_width = int(math.ceil(math.log2(self.DMEM_DEPTH)))
         self.dmem_idx_mask = 2 ** self.dmem_idx_width - 1
+        # Validity of the half limbs of each register is tracked as a bit mask with one bit per half limb. Tracking
+        # can be disabled for trusted code, the masks are left untouched then.
+        self.track_validity = track_validity
+        self.all_half_limbs_valid = 2 ** (self.LIMBS * 2) - 1
+        # dmem is either a list of ints with a list of booleans for the init state (default) or a ByteDmem with an
+        # InitBitmap (see dmem.py)
+        self.byte_dmem = byte_dmem
+        # Raise UninitializedDmemRead on reads of uninitialized dmem instead of recording them (see get_dmem())
+        self.strict_dmem = strict_dmem
         self.ctx = ctx
         self.reset(dmem, imem, s_addr, stop_addr, clear_regs=True)
 
-        self.stats = {}
+        # Statistics collector (see stats.StatsCollector), None for no statistics
+        self.stats = None
+
+        # Trace object recording executed instructions (see trace.Trace), None for no tracing
+        self.trace = None
+
+        # Translator executing straight-line code as compiled blocks in run() (see translator.BlockTranslator)
+        self.translator = None
+
+        # History of states for stepping back in the debugger (see enable_history()), None for no history
+        self.history = None
 
     def reset(self, dmem, imem, s_addr=0, stop_addr=None, clear_regs=False):
-        self.M = False
-        self.L = False
-        self.Z = False
-        self.C = False
-        self.XM = False
-        self.XL = False
-        self.XC = False
-        self.XZ = False
+        self.flags = 0
         if (clear_regs):
             self.clear_regs()
-        self.r_valid_half_limbs = [[False]*self.LIMBS*2 for i in range(self.NUM_REGS)]
-        self.dmem = []
+        self.r_valid_half_limbs = [0]*self.NUM_REGS
         self.imem = []
-        self.init_dmem = []
         self.loop_stack = []
         self.call_stack = []
-        self.dmem.clear()
-        self.init_dmem.clear()
-        for item in dmem:
-            self.dmem.append(item)
-            self.init_dmem.append(True)
-        for i in range(len(dmem), self.DMEM_DEPTH):
-            self.dmem.append(0)
-            self.init_dmem.append(False)
+        # Reads of uninitialized dmem as [pc of the first read, number of reads] by address
+        self.uninit_reads = {}
+        # Number of instructions executed so far, used as the point in time for the history
+        self.executed_inst_cnt = 0
+        # Number of cycles executed so far (restored with the state when going back in time)
+        self.executed_cycle_cnt = 0
+        # Address of the instruction executed by the last step() (the debugger may have changed the pc before)
+        self.last_pc = None
+        if self.byte_dmem:
+            self.__reset_byte_dmem(dmem)
+        else:
+            self.dmem = []
+            self.init_dmem = []
+            for item in dmem:
+                self.dmem.append(item)
+                self.init_dmem.append(True)
+            for i in range(len(dmem), self.DMEM_DEPTH):
+                self.dmem.append(0)
+                self.init_dmem.append(False)
         self.imem = imem
         self.pc = s_addr
         if not stop_addr:
@@ -138,6 +187,221 @@ class Machine(object):
         else:
             self.stop_addr = stop_addr
 
+    def __reset_byte_dmem(self, dmem):
+        """Init the byte dmem backend from a list of words or from an image (see ByteDmem.get_image())"""
+        word_bytes = self.word_bytes
+        if isinstance(dmem, (bytes, bytearray, memoryview)):
+            init_cnt = len(dmem) // word_bytes
+        else:
+            init_cnt = len(dmem)
+        depth = max(init_cnt, self.DMEM_DEPTH)
+        self.dmem = ByteDmem(depth, word_bytes)
+        self.init_dmem = InitBitmap(depth)
+        self.dmem[0:init_cnt] = dmem
+        self.init_dmem.set_range(0, init_cnt)
+
+    def snapshot(self):
+        """Take a snapshot of registers, special registers, flags, loop and call stacks, pc and dmem"""
+        return MachineSnapshot(self)
+
+    def restore(self, snap, restore_dmem=True):
+        """Restore the state from a snapshot
+
+        The lists holding the state are updated in place, references to them (e.g. to dmem) stay valid. With
+        restore_dmem set to False only the register state is restored and dmem is left untouched."""
+        self.r[:] = snap.r
+        self.r_valid_half_limbs[:] = snap.r_valid_half_limbs
+        self.mod, self.dmp, self.rfp, self.lc, self.rnd = snap.sregs
+        self.flags = snap.flags
+        self.loop_stack[:] = snap.loop_stack
+        self.call_stack[:] = snap.call_stack
+        self.pc = snap.pc
+        if restore_dmem:
+            self.dmem[:] = snap.dmem
+            self.init_dmem[:] = snap.init_dmem
+
+    def enable_history(self, interval=10000, max_snapshots=64, undo_depth=256):
+        """Keep a history of states to go back in time in the debugger (see history.History)
+
+        A snapshot is taken every interval executed instructions, at most max_snapshots of them are kept. The undo
+        log additionally holds the states at the last undo_depth stops in the debugger."""
+        from . history import History
+        self.history = History(interval, max_snapshots, undo_depth)
+        self.history.record(self.executed_inst_cnt, self)
+
+    def __replay(self, time):
+        """Execute instructions again until the given point in time without breakpoint checks, trace and
+        statistics"""
+        stats = self.stats
+        self.stats = None
+        try:
+            while self.executed_inst_cnt < time:
+                cont, batch_inst_cnt, batch_cycle_cnt = self.__run_batch(time - self.executed_inst_cnt)
+                self.executed_inst_cnt += batch_inst_cnt
+                self.executed_cycle_cnt += batch_cycle_cnt
+                if not cont:
+                    break
+        finally:
+            self.stats = stats
+
+    def __go_to(self, time):
+        """Go back to the state at the given point in time, returns False if not covered by the history"""
+        entry = self.history.find(time)
+        if entry is None:
+            return False
+        self.executed_inst_cnt, self.executed_cycle_cnt, snap = entry
+        self.restore(snap)
+        self.__replay(time)
+        self.history.truncate(time)
+        return True
+
+    def step_back(self, cnt=1):
+        """Go back to the state before the last cnt executed instructions
+
+        Returns False (and leaves the state untouched) if the history does not reach back that far."""
+        if self.history is None:
+            raise Exception('Going back requires a history, see enable_history()')
+        if cnt > self.executed_inst_cnt:
+            return False
+        return self.__go_to(self.executed_inst_cnt - cnt)
+
+    def run_back(self, addrs=None):
+        """Go back to the last state before the current one with the pc at one of the addresses in addrs
+        (default: the breakpoint addresses)
+
+        Returns False (and leaves the state untouched) if no such state is covered by the history."""
+        if self.history is None:
+            raise Exception('Going back requires a history, see enable_history()')
+        if addrs is None:
+            addrs = self.breakpoints
+        now = self.executed_inst_cnt
+        now_cycles = self.executed_cycle_cnt
+        current = self.snapshot()
+        # Search the intervals between the snapshots, starting with the latest one
+        last = None
+        end = now
+        for time, cycles, snap in self.history.get_entries_before(now):
+            self.restore(snap)
+            self.executed_inst_cnt = time
+            self.executed_cycle_cnt = cycles
+            while self.executed_inst_cnt < end:
+                if self.pc in addrs:
+                    last = self.executed_inst_cnt
+                self.__replay(self.executed_inst_cnt + 1)
+            if last is not None:
+                return self.__go_to(last)
+            end = time
+        self.restore(current)
+        self.executed_inst_cnt = now
+        self.executed_cycle_cnt = now_cycles
+        return False
+
+    def __get_checkpoint_header(self):
+        """Get the checkpoint header fields for the current state"""
+        return (self.CHECKPOINT_MAGIC, self.CHECKPOINT_VERSION, self.XLEN, self.LIMBS, self.NUM_REGS,
+                self.LOOP_STACK_SIZE, self.CALL_STACK_SIZE, len(self.dmem), self.pc, self.stop_addr, self.flags,
+                len(self.loop_stack), len(self.call_stack))
+
+    def save_checkpoint(self, path):
+        """Save registers, special registers, flags, loop and call stacks, pc and dmem to a binary file"""
+        word_bytes = self.word_bytes
+        valid_bytes = self.valid_bytes
+        data = bytearray(self.CHECKPOINT_HEADER.pack(*self.__get_checkpoint_header()))
+        for val in self.r + [getattr(self, sreg) for sreg in self.SREG_NAMES]:
+            data += val.to_bytes(word_bytes, 'little')
+        for mask in self.r_valid_half_limbs:
+            data += mask.to_bytes(valid_bytes, 'little')
+        loop_stack = [val for entry in self.loop_stack for val in entry]
+        data += struct.pack('<' + str(self.LOOP_STACK_SIZE * 3) + 'q',
+                            *(loop_stack + [0] * (self.LOOP_STACK_SIZE * 3 - len(loop_stack))))
+        data += struct.pack('<' + str(self.CALL_STACK_SIZE) + 'Q',
+                            *(self.call_stack + [0] * (self.CALL_STACK_SIZE - len(self.call_stack))))
+        if self.byte_dmem:
+            data += self.dmem.get_image()
+            data += self.init_dmem.get_image()
+        else:
+            for val in self.dmem:
+                data += val.to_bytes(word_bytes, 'little')
+            init_bitmap = bytearray((len(self.init_dmem) + 7) // 8)
+            for i, init in enumerate(self.init_dmem):
+                if init:
+                    init_bitmap[i >> 3] |= 1 << (i & 7)
+            data += init_bitmap
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def load_checkpoint(self, path):
+        """Load the state saved with save_checkpoint()
+
+        The file is memory-mapped, values are read directly from the mapping. The checkpoint must have been saved
+        by a machine with the same configuration and dmem size."""
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    self.__load_checkpoint_view(view)
+
+    def __load_checkpoint_view(self, view):
+        word_bytes = self.word_bytes
+        valid_bytes = self.valid_bytes
+        dmem_words = len(self.dmem)
+        header = self.CHECKPOINT_HEADER.unpack_from(view)
+        if header[0] != self.CHECKPOINT_MAGIC or header[1] != self.CHECKPOINT_VERSION:
+            raise Exception('Not a checkpoint file or unsupported checkpoint version')
+        if header[2:8] != self.__get_checkpoint_header()[2:8]:
+            raise Exception('Checkpoint does not match the machine configuration')
+        pc, stop_addr, flags, loop_stack_depth, call_stack_depth = header[8:]
+        size = self.CHECKPOINT_HEADER.size + (self.NUM_REGS + len(self.SREG_NAMES)) * word_bytes \
+            + self.NUM_REGS * valid_bytes + (self.LOOP_STACK_SIZE * 3 + self.CALL_STACK_SIZE) * 8 \
+            + dmem_words * word_bytes + (dmem_words + 7) // 8
+        if len(view) != size or loop_stack_depth > self.LOOP_STACK_SIZE or call_stack_depth > self.CALL_STACK_SIZE:
+            raise Exception('Corrupt checkpoint file')
+        pos = self.CHECKPOINT_HEADER.size
+        words = []
+        for i in range(self.NUM_REGS + len(self.SREG_NAMES)):
+            words.append(int.from_bytes(view[pos:pos + word_bytes], 'little'))
+            pos += word_bytes
+        self.r[:] = words[:self.NUM_REGS]
+        for sreg, val in zip(self.SREG_NAMES, words[self.NUM_REGS:]):
+            setattr(self, sreg, val)
+        for i in range(self.NUM_REGS):
+            self.r_valid_half_limbs[i] = int.from_bytes(view[pos:pos + valid_bytes], 'little')
+            pos += valid_bytes
+        loop_stack = struct.unpack_from('<' + str(self.LOOP_STACK_SIZE * 3) + 'q', view, pos)
+        pos += self.LOOP_STACK_SIZE * 3 * 8
+        self.loop_stack[:] = [loop_stack[i:i + 3] for i in range(0, loop_stack_depth * 3, 3)]
+        call_stack = struct.unpack_from('<' + str(self.CALL_STACK_SIZE) + 'Q', view, pos)
+        pos += self.CALL_STACK_SIZE * 8
+        self.call_stack[:] = call_stack[:call_stack_depth]
+        if self.byte_dmem:
+            self.dmem[:] = view[pos:pos + dmem_words * word_bytes]
+            pos += dmem_words * word_bytes
+            self.init_dmem[:] = view[pos:]
+        else:
+            self.dmem[:] = [int.from_bytes(view[p:p + word_bytes], 'little')
+                            for p in range(pos, pos + dmem_words * word_bytes, word_bytes)]
+            pos += dmem_words * word_bytes
+            self.init_dmem[:] = [bool(view[pos + (i >> 3)] & (1 << (i & 7))) for i in range(dmem_words)]
+        self.pc = pc
+        self.stop_addr = stop_addr
+        self.flags = flags
+
+    def call(self, entry, stop_addr, dmem_writes=None, max_instructions=None):
+        """Run code from entry up to stop_addr on the current state of the machine.
+
+        Only the program counter and the loop and call stacks are reset, registers, flags and dmem are kept from
+        previous runs. This allows to invoke several primitives in a row on a single long-lived machine.
+        dmem_writes is an optional dictionary with dmem addresses and values to write before execution.
+        Returns the same tuple as run()."""
+        if dmem_writes:
+            for address, value in dmem_writes.items():
+                self.set_dmem(address, value)
+        self.set_pc(entry)
+        self.stop_addr = stop_addr
+        self.loop_stack = []
+        self.call_stack = []
+        self.finishFlag = False
+        return self.run(max_instructions)
+
     def clear_regs(self):
         self.dmp = 0
         self.rfp = 0
@@ -212,12 +476,6 @@ class Machine(object):
         reg = masked_reg2 | (halflimbval << ((lidx * 2 + bool(upper)) * self.half_limb_width))
         return reg
 
-    @staticmethod
-    def __test_bit(testval, pos):
-        """Test for the value of a bit at a given position"""
-        mask = 1 << pos
-        return bool(testval & mask)
-
     @staticmethod
     def __set_bit(testval, pos):
         """Set a bit at a specific position and return the new value"""
@@ -244,20 +502,23 @@ class Machine(object):
                 raise Exception('Invalid special register')
 
     def get_reg_valid_half_limbs(self, ridx):
+        """Get the validity mask of a register (bit n set if half limb n is valid)"""
         return self.r_valid_half_limbs[ridx]
 
     def set_reg(self, ridx, value, valid_limb=None, valid_half_limb=None):
         """Set register value at register index"""
-        self.__check_reg_val(value)
+        if value < 0 or value > self.xlen_mask:
+            raise OverflowError
         if isinstance(ridx, int):
-            if valid_limb:
-                self.r_valid_half_limbs[ridx][valid_limb*2] = True
-                self.r_valid_half_limbs[ridx][valid_limb*2+1] = True
-            elif valid_half_limb:
-                self.r_valid_half_limbs[ridx][valid_half_limb] = True
-            else:
-                self.r_valid_half_limbs[ridx] = [True]*self.LIMBS*2
-            self.__check_reg_idx(ridx)
+            if self.track_validity:
+                if valid_limb:
+                    self.r_valid_half_limbs[ridx] |= 3 << (valid_limb*2)
+                elif valid_half_limb:
+                    self.r_valid_half_limbs[ridx] |= 1 << valid_half_limb
+                else:
+                    self.r_valid_half_limbs[ridx] = self.all_half_limbs_valid
+            if ridx < 0 or ridx >= self.NUM_REGS:
+                raise IndexError
             self.r[ridx] = value
         if isinstance(ridx, str):
             if ridx == 'mod':
@@ -273,6 +534,18 @@ class Machine(object):
             else:
                 raise Exception('Invalid special register')
 
+    def get_reg_unchecked(self, ridx):
+        """Get a general purpose register without bounds checks (fast path for instruction handlers)"""
+        return self.r[ridx]
+
+    def set_reg_unchecked(self, ridx, value):
+        """Set a general purpose register without bounds checks (fast path for instruction handlers)
+
+        The caller must ensure the register index and the value are within bounds."""
+        self.r[ridx] = value
+        if self.track_validity:
+            self.r_valid_half_limbs[ridx] = self.all_half_limbs_valid
+
     def get_reg_limb(self, ridx, lidx):
         """Get a single limb from a register"""
         return self.__get_limb_from_reg_val(lidx, self.get_reg(ridx))
@@ -298,13 +571,43 @@ class Machine(object):
         """Increment the program counter"""
         self.set_pc(self.get_pc() + 1)
 
-    def get_dmem(self, address):
-        """Get value for a dmem address"""
+    def get_dmem(self, address, pc=None):
+        """Get value for a dmem address
+
+        Reads of uninitialized addresses are recorded in uninit_reads (or raise UninitializedDmemRead in strict
+        mode). pc is the address of the reading instruction, the current pc is recorded if not given."""
         self.__check_dmem_addr(address)
         if not self.init_dmem[address]:
-            print('Warning: reading from uninitialized dmem memory address: ' + hex(address))
+            self.__record_uninit_read(address, pc)
         return self.dmem[address]
 
+    def __record_uninit_read(self, address, pc=None):
+        """Record a read from an uninitialized dmem address"""
+        if pc is None:
+            pc = self.pc
+        if self.strict_dmem:
+            raise UninitializedDmemRead('Reading from uninitialized dmem memory address: ' + hex(address)
+                                        + ' (pc: ' + str(pc) + ')')
+        if address in self.uninit_reads:
+            self.uninit_reads[address][1] += 1
+        else:
+            self.uninit_reads[address] = [pc, 1]
+
+    def get_uninit_read_summary(self):
+        """Get a summary of the reads from uninitialized dmem addresses, one line per address"""
+        s = ''
+        for address in sorted(self.uninit_reads):
+            pc, cnt = self.uninit_reads[address]
+            s += 'Warning: reading from uninitialized dmem memory address: ' + hex(address) + ' (' + str(cnt) \
+                 + ' reads, first at pc ' + str(pc) + ')\n'
+        return s
+
+    def report_uninit_reads(self):
+        """Print the summary of reads from uninitialized dmem addresses (if any) and clear the records"""
+        if self.uninit_reads:
+            print(self.get_uninit_read_summary(), end='')
+            self.uninit_reads.clear()
+
     def set_dmem(self, address, value):
         """Set value at a dmem address"""
         self.__check_dmem_addr(address)
@@ -312,6 +615,49 @@ class Machine(object):
         self.dmem[address] = value
         self.init_dmem[address] = True
 
+    def __check_dmem_range(self, address, words):
+        """Check if a range of dmem words is within bounds"""
+        if words < 1 or address < 0 or address + words > self.DMEM_DEPTH:
+            raise IndexError
+
+    def write_bignum(self, address, value, words):
+        """Write a value spanning several dmem words (least significant word at address)"""
+        self.__check_dmem_range(address, words)
+        if value < 0 or value >> (self.XLEN * words):
+            raise OverflowError
+        word_bytes = self.word_bytes
+        if self.byte_dmem:
+            self.dmem.write_words(address, words, value)
+            self.init_dmem.set_range(address, words)
+        else:
+            data = memoryview(value.to_bytes(words * word_bytes, 'little'))
+            self.dmem[address:address + words] = [int.from_bytes(data[pos:pos + word_bytes], 'little')
+                                                  for pos in range(0, words * word_bytes, word_bytes)]
+            self.init_dmem[address:address + words] = [True] * words
+
+    def read_bignum(self, address, words):
+        """Read a value spanning several dmem words (least significant word at address)"""
+        self.__check_dmem_range(address, words)
+        for i in range(address, address + words):
+            if not self.init_dmem[i]:
+                self.__record_uninit_read(i)
+        if self.byte_dmem:
+            return self.dmem.read_words(address, words)
+        word_bytes = self.word_bytes
+        return int.from_bytes(b''.join([word.to_bytes(word_bytes, 'little')
+                                        for word in self.dmem[address:address + words]]), 'little')
+
+    def write_bignums(self, operands):
+        """Write several values with write_bignum(), operands is an iterable of (address, value, words) tuples"""
+        for address, value, words in operands:
+            self.write_bignum(address, value, words)
+
+    def read_bignums(self, operands):
+        """Read several values with read_bignum(), operands is an iterable of (address, words) tuples
+
+        Returns a list with the values."""
+        return [self.read_bignum(address, words) for address, words in operands]
+
     def push_loop_stack(self, cnt, end_addr, start_addr):
         """Push tuple of loop count, loop end address and loop start address to loop stack"""
         self.__check_imem_addr(start_addr)
@@ -365,67 +711,41 @@ class Machine(object):
 
     def get_flag(self, flag):
         """Get a flag"""
-        if flag == 'M':
-            return self.M
-        elif flag == 'L':
-            return self.L
-        elif flag == 'Z':
-            return self.Z
-        elif flag == 'C':
-            return self.C
-        elif flag == 'XM':
-            return self.XM
-        elif flag == 'XL':
-            return self.XL
-        elif flag == 'XZ':
-            return self.XZ
-        elif flag == 'XC':
-            return self.XC
-        else:
+        if flag not in self.FLAG_POS:
             raise Exception('Invalid flag identifier')
+        return bool((self.flags >> self.FLAG_POS[flag]) & 1)
 
     def set_flag(self, flag, val):
         """Set/unset a flag"""
-        if flag == 'M':
-            self.M = val
-        elif flag == 'L':
-            self.L = val
-        elif flag == 'Z':
-            self.Z = val
-        elif flag == 'C':
-            self.C = val
-        elif flag == 'XM':
-            self.XM = val
-        elif flag == 'XL':
-            self.XL = val
-        elif flag == 'XZ':
-            self.XZ = val
-        elif flag == 'XC':
-            self.XC = val
-        else:
+        if flag not in self.FLAG_POS:
             raise Exception('Invalid flag identifier')
+        mask = 1 << self.FLAG_POS[flag]
+        if val:
+            self.flags |= mask
+        else:
+            self.flags &= ~mask
+
+    def __z_m_l_bits(self, val):
+        """Get the Z, M and L bits of the standard flag group for a given value"""
+        return ((not val & self.xlen_mask) << 1) | (((val >> self.msb_pos) & 1) << 2) | ((val & 1) << 3)
 
     def set_c_z_m_l(self, val):
         """Set/Unset C, Z, M and L flags by examining the given value"""
-        self.set_z_m_l(val)
-        self.set_flag('C', self.__test_bit(val, self.XLEN))
+        self.flags = (self.flags & self.XFLAGS_MASK) | ((val >> self.XLEN) & 1) | self.__z_m_l_bits(val)
 
     def setx_c_z_m_l(self, val):
         """Set/Unset XC, XZ, XM and XL flags by examining the given value"""
-        self.setx_z_m_l(val)
-        self.set_flag('XC', self.__test_bit(val, self.XLEN))
+        self.flags = (self.flags & self.FLAGS_MASK) \
+            | ((((val >> self.XLEN) & 1) | self.__z_m_l_bits(val)) << self.XFLAG_SHIFT)
 
     def set_z_m_l(self, val):
         """Set/Unset Z, M and L flags by examining the given value"""
-        self.set_flag('Z', not bool(val & self.xlen_mask))
-        self.set_flag('M', self.__test_bit(val, self.XLEN - 1))
-        self.set_flag('L', self.__test_bit(val, 0))
+        self.flags = (self.flags & (self.XFLAGS_MASK | 1)) | self.__z_m_l_bits(val)
 
     def setx_z_m_l(self, val):
         """Set/Unset XZ, XM and XL flags by examining the given value"""
-        self.set_flag('XZ', not bool(val & self.xlen_mask))
-        self.set_flag('XM', self.__test_bit(val, self.XLEN - 1))
-        self.set_flag('XL', self.__test_bit(val, 0))
+        self.flags = (self.flags & (self.FLAGS_MASK | 1 << self.XFLAG_SHIFT)) \
+            | (self.__z_m_l_bits(val) << self.XFLAG_SHIFT)
 
     def get_instruction(self, address):
         """Get instruction binary at an imem address"""
@@ -654,6 +974,8 @@ class Machine(object):
         print('b <addr> [pass] - toggle breakpoint')
         print('lp - list breakpoints')
         print('dump <length> [filename] - dump dmem content to hex file')
+        print('sb [cnt] - step back (requires history)')
+        print('rb - run back to previous breakpoint (requires history)')
         print('q  - quit')
 
     def __set_force_break(self, consider_callstack=False, callstack=0, consider_loopstack=False, loopstack=0):
@@ -742,6 +1064,24 @@ class Machine(object):
                         self.print_asm(self.get_pc())
                 else:
                     print('Invalid breakpoint command')
+            elif inp.split()[0] == 'sb':
+                cmd = inp.split()
+                if self.history is None:
+                    print('No history kept, can\'t step back.')
+                elif len(cmd) > 2 or (len(cmd) == 2 and not cmd[1].isdigit()):
+                    print('Invalid step back command.')
+                elif not self.step_back(int(cmd[1]) if len(cmd) == 2 else 1):
+                    print('History does not reach back that far.')
+                else:
+                    self.print_asm(self.get_pc(), 5, 5)
+            elif inp == 'rb':
+                if self.history is None:
+                    print('No history kept, can\'t run back.')
+                elif not self.run_back():
+                    print('No earlier breakpoint hit in history.')
+                else:
+                    print('Back at address ' + str(self.get_pc()) + '.')
+                    self.print_asm(self.get_pc(), 5, 5)
             elif inp.split()[0] == 'dump':
                 cmd = inp.split()
                 if len(cmd) == 2:
@@ -767,21 +1107,35 @@ class Machine(object):
 
     def step(self):
         """Next step"""
-        halt = False
-        if self.get_pc() == self.stop_addr:
-            halt = True  # halt after this instruction
-
         if self.finishFlag:
             print('\nReached \'ret\' instruction with empty call stack. Finishing here.\n')
 
-        is_break, passes = self.__check_break()
-        if is_break:
-            self.__handle_break_command(passes)
+        is_break = False
+        if self.breakpoints or self.force_break[0]:
+            is_break, passes = self.__check_break()
+            if is_break:
+                self.__handle_break_command(passes)
+
+        # checked after the break, the debugger may have gone back in time
+        halt = False
+        if self.get_pc() == self.stop_addr:
+            halt = True  # halt after this instruction
 
+        if self.history is not None:
+            if is_break:
+                self.history.record_break(self.executed_inst_cnt, self)
+            else:
+                self.history.record(self.executed_inst_cnt, self)
+        self.last_pc = self.get_pc()
         instr = self.get_instruction(self.get_pc())
         cycles = instr.get_cycles()
-        self.stat_record_instr(instr)
-        trace_str, jump_addr = instr.execute(self)
+        if self.trace is not None:
+            self.trace.record(self.get_pc(), cycles)
+        if self.stats is not None:
+            self.stats.record_instr(instr)
+        jump_addr = instr.execute(self)
+        self.executed_inst_cnt += 1
+        self.executed_cycle_cnt += cycles
         if len(self.loop_stack) and (self.get_pc() == self.get_top_loop_end_addr()):
             if self.dec_top_loop_cnt():
                 jump_addr = self.get_top_loop_start_addr()
@@ -802,9 +1156,184 @@ class Machine(object):
                 self.inc_pc()
 
         if halt:
-            return False, trace_str, cycles
+            return False, cycles
         else:
-            return cont, trace_str, cycles
+            return cont, cycles
+
+    def __needs_single_step(self):
+        """Check if execution must go through step() (breakpoints, forced breaks or trace present)"""
+        return bool(self.breakpoints) or self.force_break[0] or self.trace is not None
+
+    def __run_batch(self, max_instructions):
+        """Execute instructions without breakpoint checks and trace generation.
+
+        Returns when the stop address is reached, after max_instructions (None for unlimited) or when
+        execution finished with a 'ret' on an empty call stack. Returns a tuple with a flag indicating if
+        execution can continue, the number of executed instructions and the number of cycles."""
+        imem = self.imem
+        imem_len = len(imem)
+        stop_addr = self.stop_addr
+        loop_stack = self.loop_stack
+        stats = self.stats
+        inst_cnt = 0
+        cycle_cnt = 0
+        while inst_cnt != max_instructions:
+            pc = self.pc
+            instr = imem[pc]
+            cycle_cnt += instr.get_cycles()
+            inst_cnt += 1
+            if stats is not None:
+                stats.record_instr(instr)
+            jump_addr = instr.execute(self)
+            if loop_stack and pc == loop_stack[-1][1]:
+                if self.dec_top_loop_cnt():
+                    jump_addr = loop_stack[-1][2]
+                else:
+                    # no loops left, pop the loop stack but continue without jump
+                    self.pop_loop_stack()
+
+            if jump_addr:
+                if jump_addr < 0 or jump_addr >= imem_len:
+                    raise Exception('Invalid jump address')
+                self.pc = jump_addr
+            elif pc + 1 >= imem_len:
+                return False, inst_cnt, cycle_cnt
+            else:
+                self.pc = pc + 1
+
+            if pc == stop_addr:
+                return False, inst_cnt, cycle_cnt
+            if self.finishFlag:
+                # finish() sets a breakpoint, continue with single stepping
+                return True, inst_cnt, cycle_cnt
+        return True, inst_cnt, cycle_cnt
+
+    def enable_translation(self):
+        """Execute straight-line code in run() as compiled basic blocks.
+
+        With a statistics collector attached, the statistics of each executed block are added at once (see
+        translator.BasicBlock), they are the same as with the interpreter."""
+        from . translator import get_translator
+        self.translator = get_translator(self)
+
+    def __run_translated(self, max_instructions):
+        """Execute translated blocks and loops, flow control instructions and instructions without a block are
+        interpreted.
+
+        Returns the same tuple as __run_batch()"""
+        translator = self.translator
+        imem_len = len(self.imem)
+        stop_addr = self.stop_addr
+        loop_stack = self.loop_stack
+        stats = self.stats
+        inst_cnt = 0
+        cycle_cnt = 0
+        # Number of executions of each block by the statistics of the block. Their counts are added to the
+        # statistics collector once at the end, only the flag group switches between blocks depend on the order.
+        block_runs = {}
+        try:
+            while inst_cnt != max_instructions:
+                pc = self.pc
+                block = translator.get_block(pc)
+                if block is None:
+                    loop = translator.get_loop(pc)
+                    if loop is not None and len(loop_stack) < self.LOOP_STACK_SIZE and \
+                            not pc <= stop_addr < loop.end:
+                        iterations = loop.ins.get_iterations(self)
+                        loop_inst_cnt = 1 + iterations * loop.body_inst_cnt
+                        if iterations > 0 and \
+                                (max_instructions is None or max_instructions - inst_cnt >= loop_inst_cnt):
+                            # execute the loop instruction and all iterations of the body at once
+                            loop.fn(self, iterations)
+                            if stats is not None:
+                                # as recorded by the loop instruction, with the loop pushed on the loop stack
+                                stats.record_instr(loop.ins)
+                                stats.record_loop(pc, loop.ins.len, len(loop_stack) + 1, iterations)
+                                stats.merge(loop.body_stats, iterations)
+                            inst_cnt += loop_inst_cnt
+                            cycle_cnt += loop.ins.get_cycles() + iterations * loop.body_cycle_cnt
+                            if loop.end >= imem_len:
+                                # stay on the last instruction like the interpreter
+                                self.pc = loop.end - 1
+                                return False, inst_cnt, cycle_cnt
+                            self.pc = loop.end
+                            continue
+                if block is None or pc <= stop_addr < block.end - 1 or \
+                        (max_instructions is not None and max_instructions - inst_cnt < block.inst_cnt):
+                    cont, batch_inst_cnt, batch_cycle_cnt = self.__run_batch(1)
+                    inst_cnt += batch_inst_cnt
+                    cycle_cnt += batch_cycle_cnt
+                    if not cont or self.finishFlag:
+                        return cont, inst_cnt, cycle_cnt
+                    continue
+                block.fn(self)
+                if stats is not None:
+                    block_stats = block.stats
+                    block_runs[block_stats] = block_runs.get(block_stats, 0) + 1
+                    stats.record_flag_groups(block_stats.first_flag_group, block_stats.last_flag_group)
+                inst_cnt += block.inst_cnt
+                cycle_cnt += block.cycle_cnt
+                # continue like the interpreter after the last instruction of the block
+                pc = block.end - 1
+                jump_addr = False
+                if loop_stack and pc == loop_stack[-1][1]:
+                    if self.dec_top_loop_cnt():
+                        jump_addr = loop_stack[-1][2]
+                    else:
+                        # no loops left, pop the loop stack but continue without jump
+                        self.pop_loop_stack()
+
+                if jump_addr:
+                    self.pc = jump_addr
+                elif block.end >= imem_len:
+                    # stay on the last instruction like the interpreter
+                    self.pc = pc
+                    return False, inst_cnt, cycle_cnt
+                else:
+                    self.pc = block.end
+
+                if pc == stop_addr:
+                    return False, inst_cnt, cycle_cnt
+            return True, inst_cnt, cycle_cnt
+        finally:
+            for block_stats, runs in block_runs.items():
+                stats.merge_counts(block_stats, runs)
+
+    def run(self, max_instructions=None):
+        """Run until the stop address is reached or max_instructions were executed.
+
+        Instructions are executed in a tight loop (or as translated blocks, see enable_translation()), single
+        stepping (with breakpoint checks and trace recording) is only used while breakpoints or a trace are
+        present.
+        Returns a tuple with the number of executed instructions and cycles."""
+        inst_cnt = 0
+        cycle_cnt = 0
+        cont = True
+        while cont and inst_cnt != max_instructions:
+            if self.__needs_single_step():
+                cont, cycles = self.step()
+                inst_cnt += 1
+                cycle_cnt += cycles
+            else:
+                if max_instructions is None:
+                    remaining = None
+                else:
+                    remaining = max_instructions - inst_cnt
+                if self.history is not None:
+                    # stop at the next periodic snapshot
+                    self.history.record(self.executed_inst_cnt, self)
+                    to_snapshot = self.history.get_next_snapshot_time() - self.executed_inst_cnt
+                    if remaining is None or remaining > to_snapshot:
+                        remaining = to_snapshot
+                if self.translator is not None:
+                    cont, batch_inst_cnt, batch_cycle_cnt = self.__run_translated(remaining)
+                else:
+                    cont, batch_inst_cnt, batch_cycle_cnt = self.__run_batch(remaining)
+                self.executed_inst_cnt += batch_inst_cnt
+                self.executed_cycle_cnt += batch_cycle_cnt
+                inst_cnt += batch_inst_cnt
+                cycle_cnt += batch_cycle_cnt
+        return inst_cnt, cycle_cnt
 
 
 if __name__ == "__main__":
@@ -4,20 +4,23 @@
 
 from . assembler import Assembler
 from . disassembler import Disassembler
-from . machine import Machine
+from . machine import MachineConfig
+from . stats import StatsCollector
 
 from collections import Counter
 from tabulate import tabulate
 
 
-def read_dmem_from_file(dmemfile):
+def read_dmem_from_file(dmemfile, config=None):
+    if config is None:
+        config = MachineConfig()
     line_cnt = 0
     dmem = []
     while True:
         line_str = dmemfile.readline()
         if not line_str:
             break
-        if line_cnt == Machine.DMEM_DEPTH:
+        if line_cnt == config.dmem_depth:
             raise OverflowError('Dmem file to large')
         if ':' in line_str:
             addr = line_str.split(':')[0].strip()
@@ -60,7 +63,7 @@ def dump_instruction_histo(instruction_histo, sort_by="key"):
 
     print(tabulate(data, headers=["instruction", "count"]))
 
-def dump_function_call_stats(func_calls):
+def dump_function_call_stats(call_edges, call_sites):
     # Build function call graphs and a call site index
     # caller-index == forward, callee-indexed == reverse
     # The call graphs are on function granularity; the call sites dictionary is
@@ -68,18 +71,19 @@ def dump_function_call_stats(func_calls):
     callgraph = {}
     rev_callgraph = {}
     rev_callsites = {}
-    for c in func_calls:
-        if c['caller_func'] not in callgraph:
-            callgraph[c['caller_func']] = Counter()
-        callgraph[c['caller_func']][c['callee_func']] += 1
+    for (caller_func, callee_func), cnt in call_edges.items():
+        if caller_func not in callgraph:
+            callgraph[caller_func] = Counter()
+        callgraph[caller_func][callee_func] += cnt
 
-        if c['callee_func'] not in rev_callgraph:
-            rev_callgraph[c['callee_func']] = Counter()
-        rev_callgraph[c['callee_func']][c['caller_func']] += 1
+        if callee_func not in rev_callgraph:
+            rev_callgraph[callee_func] = Counter()
+        rev_callgraph[callee_func][caller_func] += cnt
 
-        if c['callee_func'] not in rev_callsites:
-            rev_callsites[c['callee_func']] = Counter()
-        rev_callsites[c['callee_func']][c['call_site']] += 1
+    for (callee_func, call_site), cnt in call_sites.items():
+        if callee_func not in rev_callsites:
+            rev_callsites[callee_func] = Counter()
+        rev_callsites[callee_func][call_site] += cnt
 
     total_leaf_calls = 0
     total_calls_to_funcs_with_one_callsite = 0
@@ -140,17 +144,15 @@ def dump_function_call_stats(func_calls):
                 percent=total_calls_req_call / total_func_calls * 100))
 
 
-def dump_loop_stats(loops):
-    loop_cnt = len(loops)
-    loop_len_values = [l['loop_len'] for l in loops]
-    loop_len_min = min(loop_len_values)
-    loop_len_max = max(loop_len_values)
-    loop_len_avg = sum(loop_len_values) / loop_cnt
+def dump_loop_stats(loop_len, loop_iterations):
+    loop_cnt = loop_len.cnt
+    loop_len_min = loop_len.min
+    loop_len_max = loop_len.max
+    loop_len_avg = loop_len.sum / loop_cnt
 
-    loop_iterations_values = [l['iterations'] for l in loops]
-    loop_iterations_min = min(loop_iterations_values)
-    loop_iterations_max = max(loop_iterations_values)
-    loop_iterations_avg = sum(loop_iterations_values) / loop_cnt
+    loop_iterations_min = loop_iterations.min
+    loop_iterations_max = loop_iterations.max
+    loop_iterations_avg = loop_iterations.sum / loop_cnt
 
     print("Loops: {loop_cnt}".format(loop_cnt=loop_cnt))
     print(
@@ -177,10 +179,10 @@ def dump_movi_stats(movi_stats):
 
 
 def dump_wide_mem_op_stats(wide_mem_ops):
-    mem_op_cnt = len(wide_mem_ops)
-    inc_ops = sum([s['inc_src'] + s['inc_dst'] for s in wide_mem_ops])
-    one_inc_ops = sum([s['inc_src'] ^ s['inc_dst'] for s in wide_mem_ops])
-    two_inc_ops = sum([s['inc_src'] and s['inc_dst'] for s in wide_mem_ops])
+    mem_op_cnt = sum(wide_mem_ops.values())
+    inc_ops = sum([(inc_src + inc_dst) * cnt for (op, inc_src, inc_dst), cnt in wide_mem_ops.items()])
+    one_inc_ops = sum([(inc_src ^ inc_dst) * cnt for (op, inc_src, inc_dst), cnt in wide_mem_ops.items()])
+    two_inc_ops = sum([(inc_src and inc_dst) * cnt for (op, inc_src, inc_dst), cnt in wide_mem_ops.items()])
     print("{mem_op_cnt} ld/st memory operations".format(mem_op_cnt=mem_op_cnt))
     print("{inc_ops} increment operations, on average {inc_avg:.02f} incs/op".
           format(inc_ops=inc_ops, inc_avg=inc_ops / mem_op_cnt))
@@ -194,20 +196,14 @@ def dump_wide_mem_op_stats(wide_mem_ops):
                 inc_avg=two_inc_ops / mem_op_cnt * 100))
 
 
-def dump_flag_access_stats(flag_access):
+def dump_flag_access_stats(flag_access, group_switch_cnt):
     if len(flag_access) == 0:
         print("No flag accesses.")
         return
 
-    flag_access_cnt = len(flag_access)
-    n_access_cnt = len([x for x in flag_access if x['flag_group'] == 'n'])
-    x_access_cnt = len([x for x in flag_access if x['flag_group'] == 'x'])
-
-    prev_group = flag_access[0]['flag_group']
-    group_switch_cnt = 0
-    for f in flag_access:
-        group_switch_cnt += f['flag_group'] != prev_group
-        prev_group = f['flag_group']
+    flag_access_cnt = sum(flag_access.values())
+    n_access_cnt = sum([cnt for (flag_group, op), cnt in flag_access.items() if flag_group == 'n'])
+    x_access_cnt = sum([cnt for (flag_group, op), cnt in flag_access.items() if flag_group == 'x'])
 
     print(
         "{flag_access_cnt} accesses to flags as part of an instruction execution, of which"
@@ -228,45 +224,45 @@ def dump_flag_access_stats(flag_access):
 def dump_stats(stats, config):
     print("Instruction frequencies")
     print("-----------------------")
-    dump_instruction_histo(stats['instruction_histo'], config['instruction_histo_sort_by'])
+    dump_instruction_histo(stats.get_instruction_histo(), config['instruction_histo_sort_by'])
     print()
 
     print("Function call statistics")
     print("------------------------")
-    if 'func_calls' in stats:
-        dump_function_call_stats(stats['func_calls'])
+    if stats.call_edges:
+        dump_function_call_stats(stats.call_edges, stats.call_sites)
     else:
         print("No function calls found.")
     print()
 
     print("Loop statistics")
     print("---------------")
-    if 'loops' in stats:
-        dump_loop_stats(stats['loops'])
+    if stats.loop_len.cnt:
+        dump_loop_stats(stats.loop_len, stats.loop_iterations)
     else:
         print("No loops found.")
     print()
 
     print("Movi statistics")
     print("---------------")
-    if 'movi' in stats:
-        dump_movi_stats(stats['movi'])
+    if stats.movi:
+        dump_movi_stats(stats.movi)
     else:
         print("No movi instructions found.")
     print()
 
     print("Wide load/store statistics")
     print("--------------------------")
-    if 'wide_mem_ops' in stats:
-        dump_wide_mem_op_stats(stats['wide_mem_ops'])
+    if stats.wide_mem_ops:
+        dump_wide_mem_op_stats(stats.wide_mem_ops)
     else:
         print("No wide memory operations found.")
     print()
 
     print("Flag statistics")
     print("---------------")
-    if 'flag_access' in stats:
-        dump_flag_access_stats(stats['flag_access'])
+    if stats.flag_access:
+        dump_flag_access_stats(stats.flag_access, stats.flag_group_switches)
     else:
         print("No flag accesses found.")
     print()
@@ -329,8 +325,4 @@ def all_instructions():
     ]
 
 def init_stats():
-    stats = {}
-    stats['instruction_histo'] = Counter()
-    for i in all_instructions():
-        stats['instruction_histo'][i] = 0
-    return stats
+    return StatsCollector(all_instructions())
@@ -0,0 +1,142 @@
+# Copyright lowRISC contributors.
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+from collections import Counter
+
+
+class RunningStats(object):
+    """Number, minimum, maximum and sum of a series of values"""
+
+    def __init__(self):
+        self.cnt = 0
+        self.min = None
+        self.max = None
+        self.sum = 0
+
+    def add(self, value):
+        if not self.cnt or value < self.min:
+            self.min = value
+        if not self.cnt or value > self.max:
+            self.max = value
+        self.cnt += 1
+        self.sum += value
+
+    def merge(self, other, times=1):
+        """Add the values of another series, times times"""
+        if not other.cnt:
+            return
+        if not self.cnt or other.min < self.min:
+            self.min = other.min
+        if not self.cnt or other.max > self.max:
+            self.max = other.max
+        self.cnt += other.cnt * times
+        self.sum += other.sum * times
+
+
+def _add_counts(counter, other, times):
+    """Add the counts of Counter other to Counter counter, times times"""
+    for key, cnt in other.items():
+        counter[key] += cnt * times
+
+
+class StatsCollector(object):
+    """Statistics collector for ISA design space exploration
+
+    A collector is attached to a machine by assigning it to Machine.stats. Without a collector (None) no
+    statistics are recorded. Events are aggregated as they are recorded, so the memory used does not grow with
+    the length of the run."""
+
+    def __init__(self, mnemonics=()):
+        # Mnemonics always listed in the instruction histogram, even if never executed
+        self.mnemonics = list(mnemonics)
+        # Execution counts by decoded instruction object. They are only mapped to mnemonics (by instruction class
+        # and opcode, see Ins.get_mnem()) when the histogram is requested.
+        self.instr_cnt = Counter()
+        # Number of calls by (caller function, callee function) and by (callee function, call site)
+        self.call_edges = Counter()
+        self.call_sites = Counter()
+        self.loop_len = RunningStats()
+        self.loop_iterations = RunningStats()
+        # Number of movi instructions by bit length of the immediate
+        self.movi = Counter()
+        # Number of wide memory operations by (op, inc_src, inc_dst)
+        self.wide_mem_ops = Counter()
+        # Number of flag accesses by (flag group, op) and number of accesses to a different group than the
+        # previous access
+        self.flag_access = Counter()
+        self.flag_group_switches = 0
+        self.first_flag_group = None
+        self.last_flag_group = None
+
+    def record_instr(self, instr):
+        self.instr_cnt[instr] += 1
+
+    def record_func_call(self, call_site, caller_func, callee_func):
+        self.call_edges[caller_func, callee_func] += 1
+        self.call_sites[callee_func, call_site] += 1
+
+    def record_loop(self, loop_addr, loop_len, new_loop_stack_depth, iterations):
+        self.loop_len.add(loop_len)
+        self.loop_iterations.add(iterations)
+
+    def record_movi(self, imm_size):
+        self.movi[imm_size] += 1
+
+    def record_wide_mem_op(self, op, inc_src, inc_dst):
+        self.wide_mem_ops[op, inc_src, inc_dst] += 1
+
+    def record_flag_access(self, flag_group, op):
+        self.flag_access[flag_group, op] += 1
+        if self.last_flag_group is None:
+            self.first_flag_group = flag_group
+        elif flag_group != self.last_flag_group:
+            self.flag_group_switches += 1
+        self.last_flag_group = flag_group
+
+    def record_flag_groups(self, first_flag_group, last_flag_group):
+        """Record the boundary to a sequence of flag accesses from first_flag_group to last_flag_group (None for
+        no flag accesses), the switches within the sequence are not counted"""
+        if first_flag_group is None:
+            return
+        if self.last_flag_group is None:
+            self.first_flag_group = first_flag_group
+        elif first_flag_group != self.last_flag_group:
+            self.flag_group_switches += 1
+        self.last_flag_group = last_flag_group
+
+    def merge_counts(self, other, times=1):
+        """Add the counts of another collector times times, without the flag group switches between the
+        repetitions and at the boundary to the other collector (see record_flag_groups())"""
+        _add_counts(self.instr_cnt, other.instr_cnt, times)
+        _add_counts(self.call_edges, other.call_edges, times)
+        _add_counts(self.call_sites, other.call_sites, times)
+        self.loop_len.merge(other.loop_len, times)
+        self.loop_iterations.merge(other.loop_iterations, times)
+        _add_counts(self.movi, other.movi, times)
+        _add_counts(self.wide_mem_ops, other.wide_mem_ops, times)
+        _add_counts(self.flag_access, other.flag_access, times)
+        self.flag_group_switches += other.flag_group_switches * times
+
+    def merge(self, other, times=1):
+        """Add the statistics of another collector times times, as if its events were recorded after the ones of
+        this collector (e.g. to replay the statistics of a cached run or of a translated loop)"""
+        self.merge_counts(other, times)
+        if other.first_flag_group is not None and times:
+            if other.first_flag_group != other.last_flag_group:
+                # switches between the repetitions
+                self.flag_group_switches += times - 1
+            self.record_flag_groups(other.first_flag_group, other.last_flag_group)
+
+    def get_instruction_histo(self):
+        """Get a Counter with the number of executions for each mnemonic"""
+        histo = Counter()
+        for mnem in self.mnemonics:
+            histo[mnem] = 0
+        for instr, cnt in self.instr_cnt.items():
+            histo[instr.get_mnem()] += cnt
+        return histo
+
+
+if __name__ == "__main__":
+    raise Exception('This file is not executable')
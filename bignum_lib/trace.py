@@ -0,0 +1,54 @@
+# Copyright lowRISC contributors.
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+from collections import deque
+
+
+class Trace(object):
+    """Instruction trace of a machine
+
+    Executed instructions are recorded as compact (pc, instruction index, cycle) tuples. Assembly strings are
+    only rendered when the trace is read, or for each step if a consumer is given."""
+
+    def __init__(self, imem, consumer=None, max_records=None):
+        self.imem = imem
+        # Callable receiving the rendered assembly string of each executed instruction. With a consumer the
+        # trace is streamed and records are not kept.
+        self.consumer = consumer
+        # Only the last max_records records are kept (None for unbounded)
+        self.records = deque(maxlen=max_records)
+        self.ins_cnt = 0
+        self.cycle_cnt = 0
+
+    def record(self, pc, cycles):
+        """Record execution of the instruction at pc taking the given number of cycles"""
+        record = (pc, self.ins_cnt, self.cycle_cnt)
+        self.ins_cnt += 1
+        self.cycle_cnt += cycles
+        if self.consumer is not None:
+            self.consumer(self.get_asm_str(record))
+        else:
+            self.records.append(record)
+
+    def get_asm_str(self, record):
+        """Render the assembly string for a trace record"""
+        return self.imem[record[0]].get_asm_str()[1]
+
+    def get_lines(self):
+        """Get rendered assembly strings for all recorded instructions"""
+        return [self.get_asm_str(record) for record in self.records]
+
+    def clear(self):
+        self.records.clear()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        for record in self.records:
+            yield self.get_asm_str(record)
+
+
+if __name__ == "__main__":
+    raise Exception('This file is not executable')
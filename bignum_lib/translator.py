@@ -0,0 +1,414 @@
+# Copyright lowRISC contributors.
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+from collections import OrderedDict
+
+from . instructions import ILoop
+from . stats import StatsCollector
+
+
+class BlockBuilder(object):
+    """Generates the Python source for a single basic block
+
+    Registers, special registers and flags are kept in local variables of the generated function. They are loaded
+    on first use and written back to the machine at the end of the block. Instructions emit their code through
+    the methods of this class (see Ins.translate()).
+
+    For hardware loop bodies everything used in the body is loaded before the loop and kept in local variables
+    across iterations (see begin_loop())."""
+
+    def __init__(self, translator):
+        self.xlen = translator.xlen
+        self.xlen_mask = translator.xlen_mask
+        self.half_xlen_mask = translator.half_xlen_mask
+        self.limbs = translator.limbs
+        self.limb_width = translator.limb_width
+        self.limb_mask = translator.limb_mask
+        self.half_limb_width = translator.half_limb_width
+        self.half_limb_mask = translator.half_limb_mask
+        self.reg_idx_mask = translator.reg_idx_mask
+        self.dmem_idx_mask = translator.dmem_idx_mask
+        self.dmem_depth = translator.dmem_depth
+        self.flag_pos = translator.flag_pos
+        self.xflag_shift = translator.xflag_shift
+        self.track_validity = translator.track_validity
+        self.all_half_limbs_valid = translator.all_half_limbs_valid
+        self.lines = []
+        self.uses = set()
+        self.tmp_cnt = 0
+        self.regs_loaded = set()
+        self.regs_dirty = set()
+        self.locals_loaded = set()
+        self.locals_dirty = set()
+        # registers and other machine attributes referenced by the emitted code
+        self.regs_used = set()
+        self.locals_used = set()
+        # registers are accessed with indices only known at runtime
+        self.dyn_access = False
+        self.indent = ''
+        self.loop_regs = None
+        self.loop_start = 0
+        # address of the instruction being translated
+        self.addr = 0
+
+    def emit(self, line):
+        """Append a line of code to the block body"""
+        self.lines.append(self.indent + line)
+
+    def tmp(self, expr):
+        """Assign an expression to a new temporary variable and return its name"""
+        name = 't' + str(self.tmp_cnt)
+        self.tmp_cnt += 1
+        self.emit(name + ' = ' + expr)
+        return name
+
+    def reg(self, idx):
+        """Get the local variable name holding a general purpose register"""
+        name = 'r' + str(idx)
+        self.regs_used.add(idx)
+        if idx not in self.regs_loaded:
+            self.uses.add('r')
+            self.emit(name + ' = r[' + str(idx) + ']')
+            self.regs_loaded.add(idx)
+        return name
+
+    def set_reg(self, idx, expr):
+        """Assign an expression to a general purpose register"""
+        self.emit('r' + str(idx) + ' = ' + expr)
+        self.regs_used.add(idx)
+        self.regs_loaded.add(idx)
+        self.regs_dirty.add(idx)
+
+    def get_reg_dyn(self, idx):
+        """Read a general purpose register with an index only known at runtime"""
+        self.flush_regs()
+        self.uses.add('r')
+        self.dyn_access = True
+        return self.tmp('r[' + idx + ']')
+
+    def set_reg_dyn(self, idx, expr):
+        """Write a general purpose register with an index only known at runtime"""
+        self.flush_regs()
+        self.uses.add('r')
+        self.dyn_access = True
+        self.emit('r[' + idx + '] = ' + expr)
+        if self.track_validity:
+            self.uses.add('valid')
+            self.emit('valid[' + idx + '] = ' + str(self.all_half_limbs_valid))
+        # any register may have been overwritten, reload on next use
+        self.regs_loaded.clear()
+
+    def flush_regs(self):
+        """Write back all modified general purpose registers"""
+        for idx in sorted(self.regs_dirty):
+            self.uses.add('r')
+            self.emit('r[' + str(idx) + '] = r' + str(idx))
+            if self.track_validity:
+                self.uses.add('valid')
+                self.emit('valid[' + str(idx) + '] = ' + str(self.all_half_limbs_valid))
+        self.regs_dirty.clear()
+
+    def __local(self, attr):
+        name = 'm_' + attr
+        self.locals_used.add(attr)
+        if attr not in self.locals_loaded:
+            self.emit(name + ' = m.' + attr)
+            self.locals_loaded.add(attr)
+        return name
+
+    def __set_local(self, attr, expr):
+        self.emit('m_' + attr + ' = ' + expr)
+        self.locals_used.add(attr)
+        self.locals_loaded.add(attr)
+        self.locals_dirty.add(attr)
+
+    def flag(self, flag):
+        """Expression (0 or 1) for a flag"""
+        return '((' + self.__local('flags') + ' >> ' + str(self.flag_pos[flag]) + ') & 1)'
+
+    def set_flag(self, flag, expr):
+        """Assign a boolean expression to a flag"""
+        pos = self.flag_pos[flag]
+        flags = self.__local('flags')
+        self.__set_local('flags', '(' + flags + ' & ' + str(~(1 << pos)) + ') | ((' + expr + ') << ' + str(pos) + ')')
+
+    def sreg(self, sreg):
+        """Get the local variable name holding a special register"""
+        return self.__local(sreg)
+
+    def set_sreg(self, sreg, expr):
+        """Assign an expression to a special register"""
+        self.__set_local(sreg, expr)
+
+    def __set_flag_group(self, val, x, c):
+        """Set the flags of the standard (or the extended) group from a value held in a variable with a single
+        update of the packed flags (same semantics as Machine.set_c_z_m_l() and friends)"""
+        bits = '((not (' + val + ' & ' + str(self.xlen_mask) + ')) << 1) | (((' + val + ' >> ' \
+               + str(self.xlen - 1) + ') & 1) << 2) | ((' + val + ' & 1) << 3)'
+        keep_mask = 0xe
+        if c:
+            bits = '((' + val + ' >> ' + str(self.xlen) + ') & 1) | ' + bits
+            keep_mask = 0xf
+        if x:
+            bits = '((' + bits + ') << ' + str(self.xflag_shift) + ')'
+            keep_mask <<= self.xflag_shift
+        flags = self.__local('flags')
+        self.__set_local('flags', '(' + flags + ' & ' + str(~keep_mask) + ') | ' + bits)
+
+    def set_z_m_l(self, val, x=False):
+        """Set Z, M and L (or XZ, XM and XL) flags from a value held in a variable"""
+        self.__set_flag_group(val, x, False)
+
+    def set_c_z_m_l(self, val, x=False):
+        """Set C, Z, M and L (or XC, XZ, XM and XL) flags from a value held in a variable"""
+        self.__set_flag_group(val, x, True)
+
+    def get_limb(self, sreg, lidx):
+        """Expression for a limb of a special register"""
+        return '((' + self.sreg(sreg) + ' >> ' + str(lidx * self.limb_width) + ') & ' + str(self.limb_mask) + ')'
+
+    def set_limb(self, sreg, lidx, expr):
+        """Modify a limb of a special register (same semantics as Machine.set_reg_limb())"""
+        pos = lidx * self.limb_width
+        keep_mask = self.xlen_mask ^ (self.half_limb_mask << pos)
+        self.set_sreg(sreg, '(' + self.sreg(sreg) + ' & ' + str(keep_mask) + ') | ((' + expr + ') << '
+                      + str(pos) + ')')
+
+    def get_dmem(self, addr):
+        """Read dmem at an address (held in a variable) masked with the dmem index mask"""
+        self.uses.add('dmem')
+        if self.dmem_idx_mask < self.dmem_depth:
+            cond = 'init_dmem[' + addr + ']'
+        else:
+            cond = addr + ' < ' + str(self.dmem_depth) + ' and init_dmem[' + addr + ']'
+        # uninitialized reads go through the machine to record them
+        return self.tmp('dmem[' + addr + '] if ' + cond + ' else m.get_dmem(' + addr + ', ' + str(self.addr) + ')')
+
+    def set_dmem(self, addr, expr):
+        """Write dmem at an address (held in a variable) masked with the dmem index mask"""
+        self.uses.add('dmem')
+        if self.dmem_idx_mask < self.dmem_depth:
+            self.emit('dmem[' + addr + '] = ' + expr)
+            self.emit('init_dmem[' + addr + '] = True')
+        else:
+            self.emit('m.set_dmem(' + addr + ', ' + expr + ')')
+
+    def begin_loop(self, regs, attrs):
+        """Start a loop over n iterations (n is a parameter of the generated function).
+
+        The given registers and attributes are loaded before the loop, they must include everything used in the
+        loop body."""
+        for idx in sorted(regs):
+            self.reg(idx)
+        for attr in sorted(attrs):
+            self.__local(attr)
+        self.loop_regs = set(regs)
+        self.emit('for _ in range(n):')
+        self.indent = '    '
+        self.loop_start = len(self.lines)
+
+    def end_loop(self):
+        """End the loop started with begin_loop()"""
+        if self.dyn_access:
+            # registers are read and written through the register list in the loop body, write back and reload
+            # so the next iteration starts with the same state as the first one
+            self.flush_regs()
+            for idx in sorted(self.loop_regs - self.regs_loaded):
+                self.reg(idx)
+        if len(self.lines) == self.loop_start:
+            self.emit('pass')
+        self.indent = ''
+
+    def get_src(self, name, params='m'):
+        """Get the source of the function for the block"""
+        self.flush_regs()
+        for attr in sorted(self.locals_dirty):
+            self.emit('m.' + attr + ' = m_' + attr)
+        src = ['def ' + name + '(' + params + '):']
+        if 'r' in self.uses:
+            src.append('r = m.r')
+        if 'valid' in self.uses:
+            src.append('valid = m.r_valid_half_limbs')
+        if 'dmem' in self.uses:
+            src.append('dmem = m.dmem')
+            src.append('init_dmem = m.init_dmem')
+        src.extend(self.lines)
+        if len(src) == 1:
+            src.append('pass')
+        return '\n    '.join(src) + '\n'
+
+
+class BasicBlock(object):
+    """Straight-line sequence of instructions compiled into a single Python function"""
+
+    def __init__(self, start, end, fn, inst_cnt, cycle_cnt, stats, src):
+        # Address of the first instruction and the address after the last instruction of the block
+        self.start = start
+        self.end = end
+        # Compiled function executing the block, called with the machine as only argument
+        self.fn = fn
+        self.inst_cnt = inst_cnt
+        self.cycle_cnt = cycle_cnt
+        # Statistics of a single execution of the block (see Ins.record_stats())
+        self.stats = stats
+        self.src = src
+
+
+class LoopBlock(object):
+    """Hardware loop with a straight-line body, all iterations are executed by a single compiled function"""
+
+    def __init__(self, ins, addr, end, fn, body_inst_cnt, body_cycle_cnt, body_stats, src):
+        # Loop instruction and its address
+        self.ins = ins
+        self.addr = addr
+        # Address after the last instruction of the loop body
+        self.end = end
+        # Compiled function executing the loop body, called with the machine and the number of iterations
+        self.fn = fn
+        self.body_inst_cnt = body_inst_cnt
+        self.body_cycle_cnt = body_cycle_cnt
+        # Statistics of a single iteration of the loop body (see Ins.record_stats())
+        self.body_stats = body_stats
+        self.src = src
+
+
+class BlockTranslator(object):
+    """Translates a program image into basic blocks of compiled Python code
+
+    A block starts at the address where execution enters it and extends up to the next control flow instruction
+    (IBranch, ICall, IRet, ILoop) or up to and including the last instruction of a hardware loop body. Control
+    flow instructions are not translated, they are executed by the interpreter of the machine. Blocks are
+    translated on first entry and kept for the lifetime of the translator.
+
+    Hardware loops with a body consisting only of translatable instructions (no branches, calls or nested loops)
+    are additionally translated into loop blocks executing all iterations at once."""
+
+    def __init__(self, imem, m):
+        self.imem = imem
+        self.xlen = m.XLEN
+        self.xlen_mask = m.xlen_mask
+        self.half_xlen_mask = m.half_xlen_mask
+        self.limbs = m.LIMBS
+        self.limb_width = m.limb_width
+        self.limb_mask = m.limb_mask
+        self.half_limb_width = m.half_limb_width
+        self.half_limb_mask = m.half_limb_mask
+        self.num_regs = m.NUM_REGS
+        self.reg_idx_mask = m.reg_idx_mask
+        self.dmem_idx_mask = m.dmem_idx_mask
+        self.dmem_depth = m.DMEM_DEPTH
+        self.flag_pos = m.FLAG_POS
+        self.xflag_shift = m.XFLAG_SHIFT
+        self.track_validity = m.track_validity
+        self.all_half_limbs_valid = m.all_half_limbs_valid
+        self.globals = {}
+        self.loop_ends = set()
+        for addr, ins in enumerate(imem):
+            if isinstance(ins, ILoop):
+                self.loop_ends.add(addr + ins.len)
+        self.blocks = {}
+        self.loops = {}
+
+    def get_block(self, pc):
+        """Get the block starting at pc, None if the instruction at pc can't be translated"""
+        try:
+            return self.blocks[pc]
+        except KeyError:
+            block = self.__translate(pc)
+            self.blocks[pc] = block
+            return block
+
+    def get_loop(self, pc):
+        """Get the loop block for a loop instruction at pc, None if there is no loop or it can't be translated"""
+        try:
+            return self.loops[pc]
+        except KeyError:
+            loop = self.__translate_loop(pc)
+            self.loops[pc] = loop
+            return loop
+
+    def __translate_range(self, b, start, end, split_at_loop_ends):
+        """Translate instructions from start up to end or the first instruction that can't be translated.
+
+        Returns the address after the last translated instruction and the number of cycles."""
+        addr = start
+        cycle_cnt = 0
+        while addr < end:
+            ins = self.imem[addr]
+            b.addr = addr
+            if ins is None or not ins.translate(b):
+                break
+            cycle_cnt += ins.get_cycles()
+            addr += 1
+            if split_at_loop_ends and addr - 1 in self.loop_ends:
+                break
+        return addr, cycle_cnt
+
+    def __get_stats(self, start, end):
+        """Get the statistics of executing the instructions from start up to end once"""
+        stats = StatsCollector()
+        for ins in self.imem[start:end]:
+            stats.record_instr(ins)
+            ins.record_stats(stats)
+        return stats
+
+    def __compile(self, name, src):
+        namespace = {}
+        exec(compile(src, '<' + name + '>', 'exec'), self.globals, namespace)
+        return namespace[name]
+
+    def __translate(self, start):
+        b = BlockBuilder(self)
+        end, cycle_cnt = self.__translate_range(b, start, len(self.imem), True)
+        if end == start:
+            return None
+        name = 'block_' + str(start)
+        src = b.get_src(name)
+        return BasicBlock(start, end, self.__compile(name, src), end - start, cycle_cnt,
+                          self.__get_stats(start, end), src)
+
+    def __translate_loop(self, addr):
+        ins = self.imem[addr]
+        if not isinstance(ins, ILoop) or ins.len < 1:
+            return None
+        start = addr + 1
+        end = addr + ins.len + 1
+        if end > len(self.imem):
+            return None
+        # first pass to find everything used in the body
+        scan = BlockBuilder(self)
+        if self.__translate_range(scan, start, end, False)[0] != end:
+            return None
+        b = BlockBuilder(self)
+        b.begin_loop(scan.regs_used, scan.locals_used)
+        cycle_cnt = self.__translate_range(b, start, end, False)[1]
+        b.end_loop()
+        name = 'loop_' + str(addr)
+        src = b.get_src(name, 'm, n')
+        return LoopBlock(ins, addr, end, self.__compile(name, src), end - start, cycle_cnt,
+                         self.__get_stats(start, end), src)
+
+
+# Translators by program image and machine geometry, the least recently used ones are dropped when more than
+# MAX_CACHED_TRANSLATORS are cached. The image is referenced from the cache, so its id can't be reused while cached.
+MAX_CACHED_TRANSLATORS = 8
+_translators = OrderedDict()
+
+
+def get_translator(m):
+    """Get the (cached) translator for the program image, geometry and configuration of a machine"""
+    key = (id(m.imem), m.XLEN, m.LIMBS, m.NUM_REGS, m.DMEM_DEPTH, m.track_validity)
+    if key in _translators:
+        _translators.move_to_end(key)
+        imem, translator = _translators[key]
+        return translator
+    translator = BlockTranslator(m.imem, m)
+    _translators[key] = (m.imem, translator)
+    if len(_translators) > MAX_CACHED_TRANSLATORS:
+        _translators.popitem(last=False)
+    return translator
+
+
+if __name__ == "__main__":
+    raise Exception('This file is not executable')
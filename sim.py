@@ -15,6 +15,14 @@ def main():
     argparser.add_argument('-s', '--start-address', help='Start address in instruction memory')
     argparser.add_argument('-e', '--stop-address', help='Stop address in instruction memory')
     argparser.add_argument('-b', '--init-break', help='Set breakpoint at start address', action='store_true')
+    argparser.add_argument('-r', '--history', help='Keep a history for stepping back in the debugger',
+                           action='store_true')
+    argparser.add_argument('--history-interval', help='Number of instructions between history snapshots',
+                           type=int, default=10000)
+    argparser.add_argument('--history-snapshots', help='Maximum number of history snapshots kept', type=int,
+                           default=64)
+    argparser.add_argument('--history-undo-depth', help='Number of debugger stops kept in the undo log', type=int,
+                           default=256)
     mutexgroup_input_file = argparser.add_mutually_exclusive_group(required=True)
     mutexgroup_input_file.add_argument('-x', '--hex-file', help='Input hex file')
     mutexgroup_input_file.add_argument('-a', '--asm-file', help='Input assembly file')
@@ -81,7 +89,7 @@ def main():
     if args.hex_file:
         try:
             insfile = open(args.hex_file)
-            ins_objects = ins_objects_from_hex_file(insfile)
+            ins_objects, ins_ctx = ins_objects_from_hex_file(insfile)
             insfile.close()
         except IOError:
             print('Could not open file ' + args.insfile)
@@ -104,19 +112,24 @@ def main():
     if args.init_break:
         machine.toggle_breakpoint(start_addr)
 
+    if args.history:
+        machine.enable_history(args.history_interval, args.history_snapshots, args.history_undo_depth)
+
     if len(ins_objects) == 0:
         raise Exception('No code to execute, check input file content')
 
     cont = True
-    inst_cnt = 0
-    cycle_cnt = 0
     while cont:
-        log_str = 'imem: ' + str(machine.get_pc()) + ', #ins: ' + str(inst_cnt)
-        cont, trace_str, cycles = machine.step()
-        print(trace_str + ' (' + log_str + ')')
-        inst_cnt += 1
-        cycle_cnt += cycles
-
+        cont = machine.step()[0]
+        # the debugger may have gone back in time in step(), take pc and counts from the machine
+        pc = machine.last_pc
+        inst_cnt = machine.executed_inst_cnt
+        log_str = 'imem: ' + str(pc) + ', #ins: ' + str(inst_cnt - 1)
+        print(machine.get_instruction(pc).get_asm_str()[1] + ' (' + log_str + ')')
+
+    machine.report_uninit_reads()
+    print('\nTotal: ' + str(machine.executed_inst_cnt) + ' instructions, taking ' + str(machine.executed_cycle_cnt)
+          + ' cycles.')
     print('\n')
     print(machine.get_all_flags_table())
     print('\n')
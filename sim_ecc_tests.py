@@ -8,8 +8,9 @@ Runs ECC operations based on the primitives contained in the binary blob of
 the p256 lib.
 """
 
-from bignum_lib.machine import Machine
+from bignum_lib.machine import Machine, MachineConfig
 from bignum_lib.sim_helpers import *
+from bignum_lib.trace import Trace
 from sim import ins_objects_from_hex_file
 from Crypto.Math.Numbers import Integer
 from Crypto.PublicKey import ECC
@@ -20,6 +21,17 @@ import sys
 # Switch to True to get a full instruction trace
 ENABLE_TRACE_DUMP = False
 
+# Switch to False to run without collecting statistics (faster)
+ENABLE_STATS = True
+
+# Switch to False to execute the P256 initialization before every operation instead of starting from the cached
+# machine state after its first execution (the statistics of the initialization are replayed from the cache)
+ENABLE_P256INIT_CACHE = True
+
+# Switch to True to execute the P256 initialization on every use of the cache and check it still results in the
+# cached state
+REVALIDATE_P256INIT_CACHE = False
+
 # Configuration for the statistics prints
 STATS_CONFIG = {
     'instruction_histo_sort_by': 'key',
@@ -30,7 +42,8 @@ BN_LIMB_LEN = 32
 BN_MASK = 2**BN_WORD_LEN-1
 BN_LIMB_MASK = 2**BN_LIMB_LEN-1
 #BN_MAX_WORDS = 16  # Max number of bn words per val (for 4096 bit words)
-DMEM_DEPTH = 1024
+# Geometry of the simulated machine
+MACHINE_CONFIG = MachineConfig()
 PROGRAM_HEX_FILE = 'hex/dcrypto_p256.hex'
 
 # pointers to dmem areas according to calling conventions of the p256 lib
@@ -85,6 +98,11 @@ msg_digest_int = int(msg_digest.hexdigest(), 16)
 
 ins_objects = []
 dmem = []
+machine = None
+# Register state of the machine after its creation
+initial_state = None
+# Cached machine state after the P256 initialization with its instruction and cycle count
+p256init_state = None
 inst_cnt = 0
 cycle_cnt = 0
 stats = init_stats()
@@ -139,9 +157,10 @@ def get_msg_str(val):
 
 # DMEM manipulation
 def init_dmem():
-    global dmem
-    """Create the simulator side of dmem and init with zeros."""
-    dmem = [0]*DMEM_DEPTH
+    """Init the simulator side of dmem with zeros.
+
+    The list is cleared in place, once the program is loaded it is the dmem of the machine."""
+    dmem[:] = [0]*MACHINE_CONFIG.dmem_depth
 
 
 def load_pointer():
@@ -154,197 +173,179 @@ def load_pointer():
     pval += (pX << BN_LIMB_LEN*5)
     pval += (pY << BN_LIMB_LEN*6)
     pval += (pD << BN_LIMB_LEN*7)
-    dmem[pLoc] = pval
+    machine.write_bignum(pLoc, pval, 1)
 
 
 def load_k(k):
     """Load the ECDSA nonce in dmem at appropriate location according to calling conventions"""
-    dmem[pK] = k
+    machine.write_bignum(pK, k, 1)
 
 
 def load_rnd(rnd):
     """Load the random seed in dmem at appropriate location according to calling conventions"""
-    dmem[pRnd] = rnd
+    machine.write_bignum(pRnd, rnd, 1)
 
 
 def load_msg(msg):
     """Load the msg digest in dmem at appropriate location according to calling conventions"""
-    dmem[pMsg] = msg
+    machine.write_bignum(pMsg, msg, 1)
 
 
 def load_r(r):
     """Load the r value of the signature in dmem at appropriate location according to calling conventions"""
-    dmem[pR] = r
+    machine.write_bignum(pR, r, 1)
 
 
 def load_s(s):
     """Load the s value of the signature in dmem at appropriate location according to calling conventions"""
-    dmem[pS] = s
+    machine.write_bignum(pS, s, 1)
 
 
 def load_x(x):
     """Load the x coordinate of public key in dmem at appropriate location according to calling conventions"""
-    dmem[pX] = x
+    machine.write_bignum(pX, x, 1)
 
 
 def load_y(y):
     """Load the y coordinate of public key in dmem at appropriate location according to calling conventions"""
-    dmem[pY] = y
+    machine.write_bignum(pY, y, 1)
 
 
 def load_d(d):
     """Load the private key in dmem at appropriate location according to calling conventions"""
-    dmem[pD] = d
+    machine.write_bignum(pD, d, 1)
 
 
 # Program loading
 def load_program():
     global ins_objects
     global ctx
-    """Load binary executable from file"""
+    global machine
+    global dmem
+    global initial_state
+    global p256init_state
+    """Load binary executable from file and create the machine running it"""
     insfile = open(PROGRAM_HEX_FILE)
     ins_objects, ctx = ins_objects_from_hex_file(insfile)
     insfile.close()
+    # All primitives are invoked on the same machine, the simulator side of dmem is the dmem of the machine
+    machine = Machine(dmem, ins_objects, ctx=ctx, config=MACHINE_CONFIG)
+    dmem = machine.dmem
+    initial_state = machine.snapshot()
+    p256init_state = None
 
 
-def dump_trace_str(trace_string):
+def run_machine(start_addr, stop_addr, collect_stats=True, collector=None):
+    """Run the machine from start_addr up to stop_addr and add up the global instruction and cycle counters.
+
+    Statistics are recorded by collector instead of the global collector if one is given."""
+    global inst_cnt
+    global cycle_cnt
+    if not collect_stats:
+        machine.stats = None
+    elif collector is not None:
+        machine.stats = collector
+    else:
+        machine.stats = stats
     if ENABLE_TRACE_DUMP:
-        print(trace_string)
+        machine.trace = Trace(machine.imem, consumer=print)
+    if machine.translator is None:
+        # execute straight-line code as translated blocks
+        machine.enable_translation()
+    machine_inst_cnt, machine_cycle_cnt = machine.call(start_addr, stop_addr)
+    inst_cnt += machine_inst_cnt
+    cycle_cnt += machine_cycle_cnt
+
+
+def get_reg_state(snap):
+    """Get the state of a machine snapshot without dmem"""
+    return snap.r, snap.r_valid_half_limbs, snap.sregs, snap.flags, snap.loop_stack, snap.call_stack, snap.pc
+
+
+def run_p256init(collect_stats=True):
+    """Runs the P256 initialization or starts from the cached machine state after it.
+
+    The initialization only sets up registers, it does not depend on the inputs in dmem and it does not write
+    dmem. Hence all operations can start from the register state after a single execution of it (on the register
+    state of a newly created machine). The initialization is always executed on that register state, with and
+    without the cache. While statistics are collected, the statistics of the initialization are cached along with
+    the state and added to the global collector on every use of the cache. The cache is not used while a trace is
+    collected. The instruction and cycle counts of the initialization are added to the global counters in any
+    case.
+    """
+    global inst_cnt
+    global cycle_cnt
+    global p256init_state
+    if not ENABLE_P256INIT_CACHE or ENABLE_TRACE_DUMP:
+        # from the same register state as with the cache
+        machine.restore(initial_state, restore_dmem=False)
+        run_machine(P256INIT_START_ADDR, P256INIT_STOP_ADDR, collect_stats)
+        return
+    # the cached state lacks the statistics if it was taken while no statistics were collected
+    if (p256init_state is None or REVALIDATE_P256INIT_CACHE
+            or (stats is not None and p256init_state[3] is None)):
+        prev_inst_cnt = inst_cnt
+        prev_cycle_cnt = cycle_cnt
+        init_stats_delta = init_stats() if stats is not None else None
+        machine.restore(initial_state, restore_dmem=False)
+        run_machine(P256INIT_START_ADDR, P256INIT_STOP_ADDR, init_stats_delta is not None, init_stats_delta)
+        state = (machine.snapshot(), inst_cnt - prev_inst_cnt, cycle_cnt - prev_cycle_cnt, init_stats_delta)
+        if p256init_state is not None and (get_reg_state(state[0]) != get_reg_state(p256init_state[0])
+                                           or state[1:3] != p256init_state[1:3]):
+            raise Exception('P256 initialization does not result in the cached machine state')
+        p256init_state = state
+    else:
+        snap = p256init_state[0]
+        machine.restore(snap, restore_dmem=False)
+        inst_cnt += p256init_state[1]
+        cycle_cnt += p256init_state[2]
+    if collect_stats and stats is not None:
+        stats.merge(p256init_state[3])
 
 
 def run_isoncurve(x, y):
     """Runs the isoncurve primitive to check if a point is a valid curve point"""
-    global dmem
-    global inst_cnt
-    global cycle_cnt
-    global ctx
-    global stats
     load_pointer()
-    machine = Machine(dmem.copy(), ins_objects, P256INIT_START_ADDR, P256INIT_STOP_ADDR, ctx=ctx)
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
-    dmem = machine.dmem.copy()
+    run_p256init(collect_stats=False)
     load_x(x)
     load_y(y)
-    machine.dmem = dmem.copy()
-    machine.pc = P256ISONCURVE_START_ADDR
-    machine.stop_addr = P256ISONCURVE_STOP_ADDR
-    cont = True
-    machine.stats = stats
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
-    dmem = machine.dmem.copy()
+    run_machine(P256ISONCURVE_START_ADDR, P256ISONCURVE_STOP_ADDR)
     # point is on curve if r and s are equal
     on_curve = (dmem[pS] == dmem[pR])
     return on_curve
 
 def run_scalarmult(x, y, k):
     """Runs the scalarmult primitive to multiply a curve point with a scalar"""
-    global dmem
-    global inst_cnt
-    global cycle_cnt
-    global ctx
-    global stats
     load_pointer()
-    machine = Machine(dmem.copy(), ins_objects, P256INIT_START_ADDR, P256INIT_STOP_ADDR, ctx=ctx)
-    machine.stats = stats
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
-    dmem = machine.dmem.copy()
+    run_p256init()
     load_x(x)
     load_y(y)
     load_k(k)
-    machine.dmem = dmem.copy()
-    machine.pc = P256SCALARMULT_START_ADDR
-    machine.stop_addr = P256SCALARMULT_STOP_ADDR
-    machine.stats = stats
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
-    dmem = machine.dmem.copy()
+    run_machine(P256SCALARMULT_START_ADDR, P256SCALARMULT_STOP_ADDR)
     return dmem[pX], dmem[pY]
 
 
 def run_sign(d, k, msg):
     """Runs the sign primitive to perform an ecdsa sign"""
-    global dmem
-    global inst_cnt
-    global cycle_cnt
-    global ctx
-    global stats
     load_pointer()
-    machine = Machine(dmem.copy(), ins_objects, P256INIT_START_ADDR, P256INIT_STOP_ADDR, ctx=ctx)
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
-    dmem = machine.dmem.copy()
+    run_p256init(collect_stats=False)
     load_msg(msg)
     load_d(d)
     load_k(k)
-    machine.dmem = dmem.copy()
-    machine.pc = P256SIGN_START_ADDR
-    machine.stop_addr = P256SIGN_STOP_ADDR
-    machine.stats = stats
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
-    dmem = machine.dmem.copy()
+    run_machine(P256SIGN_START_ADDR, P256SIGN_STOP_ADDR)
     return dmem[pR], dmem[pS]
 
 
 def run_verify(x, y, r, s, msg):
     """Runs the sign primitive to perform an ecdsa sign"""
-    global dmem
-    global inst_cnt
-    global cycle_cnt
-    global ctx
-    global stats
     load_pointer()
-    machine = Machine(dmem.copy(), ins_objects, P256INIT_START_ADDR, P256INIT_STOP_ADDR, ctx=ctx)
-    machine.stats = stats
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
-    dmem = machine.dmem.copy()
+    run_p256init()
     load_x(x)
     load_y(y)
     load_r(r)
     load_s(s)
     load_msg(msg)
-    machine.dmem = dmem.copy()
-    machine.pc = P256VERIFY_START_ADDR
-    machine.stop_addr = P256VERIFY_STOP_ADDR
-    machine.stats = stats
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
-    dmem = machine.dmem.copy()
+    run_machine(P256VERIFY_START_ADDR, P256VERIFY_STOP_ADDR)
     # Verification successful if r == rnd
     return dmem[pR] == dmem[pRnd]
 
@@ -447,7 +448,10 @@ def run_test(name):
     # reset global counter variables
     inst_cnt = 0
     cycle_cnt = 0
-    stats = init_stats()
+    if ENABLE_STATS:
+        stats = init_stats()
+    else:
+        stats = None
 
     # run test
     getattr(sys.modules[__name__], "run_test_" + name)()
@@ -457,7 +461,9 @@ def run_test(name):
     test_results['cycle_cnt'] = cycle_cnt
     test_results['stats'] = stats
 
-    dump_stats(stats, STATS_CONFIG)
+    machine.report_uninit_reads()
+    if stats is not None:
+        dump_stats(stats, STATS_CONFIG)
     print("Total: %d instructions, taking %d cycles." % (inst_cnt, cycle_cnt))
 
     return test_results
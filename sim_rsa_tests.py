@@ -9,12 +9,31 @@ the generic bignum library. Hence these are wrappers around mainly modexp and
 montmul operations.
 """
 
-from bignum_lib.machine import Machine
+from collections import OrderedDict
+from bignum_lib.machine import Machine, MachineConfig
 from bignum_lib.sim_helpers import *
+from bignum_lib.trace import Trace
 
 # Switch to True to get a full instruction trace
 ENABLE_TRACE_DUMP = False
 
+# Switch to False to run without collecting statistics (faster)
+ENABLE_STATS = True
+
+# Switch to True to store dmem in a bytearray (see bignum_lib/dmem.py), multi-word values are then moved in and out
+# of dmem without converting them word by word
+ENABLE_BYTE_DMEM = False
+
+# Switch to False to run the modload primitive for every operation instead of reusing its results for a modulus
+# (the statistics of the primitive are replayed from the cache)
+ENABLE_MODLOAD_CACHE = True
+
+# Maximum number of moduli with cached modload results (least recently used results are dropped first)
+MODLOAD_CACHE_SIZE = 16
+
+# Re-run the modload primitive on every n-th cache hit and check it results in the cached values (0 to disable)
+MODLOAD_CACHE_VERIFY_INTERVAL = 0
+
 # Configuration for the statistics prints
 STATS_CONFIG = {
     'instruction_histo_sort_by': 'key',
@@ -25,7 +44,8 @@ BN_LIMB_LEN = 32
 BN_MASK = 2**BN_WORD_LEN-1
 BN_LIMB_MASK = 2**BN_LIMB_LEN-1
 BN_MAX_WORDS = 16  # Max number of bn words per val (for 4096 bit words)
-DMEM_DEPTH = 1024
+# Geometry of the simulated machine
+MACHINE_CONFIG = MachineConfig()
 PROGRAM_HEX_FILE = 'hex/dcrypto_bn.hex'
 
 # pointers to dmem areas according to calling conventions for bignum lib
@@ -67,6 +87,13 @@ EXP_PUB = 65537
 
 ins_objects = []
 dmem = []
+machine = None
+# State of the machine before the first primitive, modload is always executed on its registers
+initial_state = None
+# Cached modload results (dinv, RR words, instruction count, cycle count, machine state, statistics) by
+# (modulus, bn_words)
+modload_cache = OrderedDict()
+modload_cache_hits = 0
 inst_cnt = 0
 cycle_cnt = 0
 stats = init_stats()
@@ -122,9 +149,10 @@ def get_msg_str(val):
 
 # DMEM manipulation
 def init_dmem():
-    global dmem
-    """Create the simulator side of dmem and init with zeros."""
-    dmem = [0]*DMEM_DEPTH
+    """Init the simulator side of dmem with zeros.
+
+    The list is cleared in place, once the program is loaded it is the dmem of the machine."""
+    dmem[:] = [0]*MACHINE_CONFIG.dmem_depth
 
 
 def load_pointer(bn_words, p_loc, p_a, p_b, p_c):
@@ -155,16 +183,12 @@ def load_blinding(pubexp, rnd, pad1, pad2):
 
 def load_full_bn_val(dmem_p, bn_val):
     """Load a full multi-word bignum value into dmem"""
-    for i in range(0, BN_MAX_WORDS):
-        dmem[dmem_p+i] = (bn_val >> (BN_WORD_LEN*i)) & BN_MASK
+    machine.write_bignum(dmem_p, bn_val, BN_MAX_WORDS)
 
 
 def get_full_bn_val(dmem_p, machine, bn_words=BN_MAX_WORDS):
     """Get a full multi-word bignum value form dmem"""
-    bn_val = 0
-    for i in range(0, bn_words):
-        bn_val += machine.get_dmem(i+dmem_p) << (BN_WORD_LEN*i)
-    return bn_val
+    return machine.read_bignum(dmem_p, bn_words)
 
 
 def load_mod(mod):
@@ -176,15 +200,39 @@ def load_mod(mod):
 def load_program():
     global ins_objects
     global ctx
-    """Load binary executable from file"""
+    global machine
+    global dmem
+    global initial_state
+    """Load binary executable from file and create the machine running it"""
     insfile = open(PROGRAM_HEX_FILE)
     ins_objects, ctx = ins_objects_from_hex_file(insfile)
     insfile.close()
+    # All primitives are invoked on the same machine, the simulator side of dmem is the dmem of the machine
+    machine = Machine(dmem, ins_objects, ctx=ctx, byte_dmem=ENABLE_BYTE_DMEM, config=MACHINE_CONFIG)
+    dmem = machine.dmem
+    initial_state = machine.snapshot()
 
 
-def dump_trace_str(trace_string):
+def run_machine(start_addr, stop_addr, collector=None):
+    """Run the machine from start_addr up to stop_addr and add up the global instruction and cycle counters.
+
+    Statistics are recorded by collector instead of the global collector if one is given."""
+    global inst_cnt
+    global cycle_cnt
+    machine.stats = collector if collector is not None else stats
     if ENABLE_TRACE_DUMP:
-        print(trace_string)
+        machine.trace = Trace(machine.imem, consumer=print)
+    if machine.translator is None:
+        # execute straight-line code as translated blocks
+        machine.enable_translation()
+    machine_inst_cnt, machine_cycle_cnt = machine.call(start_addr, stop_addr)
+    inst_cnt += machine_inst_cnt
+    cycle_cnt += machine_cycle_cnt
+
+
+def get_reg_state(snap):
+    """Get the state of a machine snapshot without dmem"""
+    return snap.r, snap.r_valid_half_limbs, snap.sregs, snap.flags, snap.loop_stack, snap.call_stack, snap.pc
 
 
 # primitive access
@@ -194,84 +242,83 @@ def run_modload(bn_words):
     Other than it's name suggests this primitive computes RR and the
     montgomery inverse dinv. The modulus is actually directly loaded into dmem
     beforehand. This primitive has to be executed every time, dmem was cleared.
+
+    The primitive only writes dinv and RR to dmem. It is always executed on
+    the register state of a newly created machine, so it leaves the same
+    register state for a modulus. The dmem values and the register state are
+    cached for each modulus and restored directly when the modulus is used
+    again (see ENABLE_MODLOAD_CACHE). While statistics are collected, the statistics of
+    the primitive are cached along with the results and added to the global
+    collector on every cache hit. The cache is not used while a trace is
+    collected. The instruction and cycle counts of the primitive are added to
+    the global counters in any case.
     """
-    global dmem
+    global modload_cache_hits
     global inst_cnt
     global cycle_cnt
-    global stats
-    global ctx
     start_addr = 414
     stop_addr = 425
     load_pointer(bn_words, DMEM_LOC_IN_PTRS, DMEMP_IN, DMEMP_EXP, DMEMP_OUT)
-    machine = Machine(dmem.copy(), ins_objects, start_addr, stop_addr, ctx=ctx)
-    machine.stats = stats
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
-    dmem = machine.dmem.copy()
+    use_cache = ENABLE_MODLOAD_CACHE and not ENABLE_TRACE_DUMP
+    key = (get_full_bn_val(DMEMP_MOD, machine, bn_words), bn_words)
+    # an entry cached while no statistics were collected lacks the statistics
+    if use_cache and key in modload_cache and (stats is None or modload_cache[key][5] is not None):
+        modload_cache.move_to_end(key)
+        modload_cache_hits += 1
+        if not MODLOAD_CACHE_VERIFY_INTERVAL or modload_cache_hits % MODLOAD_CACHE_VERIFY_INTERVAL:
+            dinv_res, rr_words, modload_inst_cnt, modload_cycle_cnt, snap, modload_stats = modload_cache[key]
+            machine.restore(snap, restore_dmem=False)
+            dmem[DMEMP_DINV] = dinv_res
+            dmem[DMEMP_RR:DMEMP_RR+bn_words] = rr_words
+            inst_cnt += modload_inst_cnt
+            cycle_cnt += modload_cycle_cnt
+            if stats is not None:
+                stats.merge(modload_stats)
+            return dinv_res, get_full_bn_val(DMEMP_RR, machine, bn_words)
+    prev_inst_cnt = inst_cnt
+    prev_cycle_cnt = cycle_cnt
+    modload_stats = init_stats() if use_cache and stats is not None else None
+    machine.restore(initial_state, restore_dmem=False)
+    run_machine(start_addr, stop_addr, modload_stats)
+    if modload_stats is not None:
+        stats.merge(modload_stats)
     dinv_res = dmem[DMEMP_DINV]
     rr_res = get_full_bn_val(DMEMP_RR, machine, bn_words)
+    if use_cache:
+        entry = (dinv_res, tuple(dmem[DMEMP_RR:DMEMP_RR+bn_words]), inst_cnt - prev_inst_cnt,
+                 cycle_cnt - prev_cycle_cnt, machine.snapshot(), modload_stats)
+        if key in modload_cache and (modload_cache[key][:4] != entry[:4]
+                                     or get_reg_state(modload_cache[key][4]) != get_reg_state(entry[4])):
+            raise Exception('modload does not result in the cached values')
+        modload_cache[key] = entry
+        modload_cache.move_to_end(key)
+        if len(modload_cache) > MODLOAD_CACHE_SIZE:
+            modload_cache.popitem(last=False)
     return dinv_res, rr_res
 
 
 def run_montmul(bn_words, p_a, p_b, p_out):
     """Runs the primitive for montgomery multiplication (mulx)"""
-    global dmem
-    global inst_cnt
-    global cycle_cnt
-    global stats
-    global ctx
     start_addr = 172
     stop_addr = 190
     load_pointer(bn_words, DMEM_LOC_IN_PTRS, p_a, p_b, p_out)
-    machine = Machine(dmem.copy(), ins_objects, start_addr, stop_addr, ctx=ctx)
-    machine.stats = stats
-    cont = True
-    i = 0
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        i += 1
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
+    run_machine(start_addr, stop_addr)
     res = get_full_bn_val(DMEMP_OUT, machine, bn_words)
-    dmem = machine.dmem.copy()
     return res
 
 
 def run_montout(bn_words, p_a, p_out):
     """Runs the primitive for back-transformation from the montgomery domain (mul1)"""
-    global dmem
-    global inst_cnt
-    global cycle_cnt
-    global stats
-    global ctx
     start_addr = 236
     stop_addr = 239
     load_pointer(bn_words, DMEM_LOC_IN_PTRS, p_a, 0, p_out)
-    machine = Machine(dmem.copy(), ins_objects, start_addr, stop_addr, ctx=ctx)
-    machine.stats = stats
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
+    run_machine(start_addr, stop_addr)
     res = get_full_bn_val(DMEMP_OUT, machine, bn_words)
-    dmem = machine.dmem.copy()
     return res
 
 
 def run_modexp(bn_words, exp):
     """Runs the primitive for modular exponentiation (modexp)"""
-    global dmem
-    global inst_cnt
-    global cycle_cnt
-    global stats
-    global ctx
     start_addr = 303
     stop_addr = 337
     load_full_bn_val(DMEMP_EXP, exp)
@@ -279,25 +326,12 @@ def run_modexp(bn_words, exp):
     load_pointer(bn_words, DMEM_LOC_SQR_PTRS, DMEMP_OUT, DMEMP_OUT, DMEMP_OUT)
     load_pointer(bn_words, DMEM_LOC_MUL_PTRS, DMEMP_IN, DMEMP_OUT, DMEMP_OUT)
     load_pointer(bn_words, DMEM_LOC_OUT_PTRS, DMEMP_OUT, DMEMP_EXP, DMEMP_OUT)
-    machine = Machine(dmem.copy(), ins_objects, start_addr, stop_addr, ctx=ctx)
-    machine.stats = stats
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
+    run_machine(start_addr, stop_addr)
     res = get_full_bn_val(DMEMP_OUT, machine, bn_words)
-    dmem = machine.dmem.copy()
     return res
 
 def run_modexp_blinded(bn_words, exp):
     """Runs the primitive for modular exponentiation (modexp)"""
-    global dmem
-    global inst_cnt
-    global cycle_cnt
-    global stats
-    global ctx
     start_addr = 338
     stop_addr = 413
     load_full_bn_val(DMEMP_EXP, exp)
@@ -306,16 +340,8 @@ def run_modexp_blinded(bn_words, exp):
     load_pointer(bn_words, DMEM_LOC_MUL_PTRS, DMEMP_IN, DMEMP_OUT, DMEMP_OUT)
     load_pointer(bn_words, DMEM_LOC_OUT_PTRS, DMEMP_OUT, DMEMP_EXP, DMEMP_OUT)
     load_blinding(EXP_PUB,0,0,0)
-    machine = Machine(dmem.copy(), ins_objects, start_addr, stop_addr, ctx=ctx)
-    machine.stats = stats
-    cont = True
-    while cont:
-        cont, trace_str, cycles = machine.step()
-        dump_trace_str(trace_str)
-        inst_cnt += 1
-        cycle_cnt += cycles
+    run_machine(start_addr, stop_addr)
     res = get_full_bn_val(DMEMP_OUT, machine, bn_words)
-    dmem = machine.dmem.copy()
     return res
 
 
@@ -427,7 +453,10 @@ def main():
         # reset global counter variables
         inst_cnt = 0
         cycle_cnt = 0
-        stats = init_stats()
+        if ENABLE_STATS:
+            stats = init_stats()
+        else:
+            stats = None
 
         if test_op == 'enc':
             enc = rsa_encrypt(RSA_N[test_width], test_width // 256, msg)
@@ -446,7 +475,9 @@ def main():
 
         tests_results.append(test_results)
 
-        dump_stats(stats, STATS_CONFIG)
+        machine.report_uninit_reads()
+        if stats is not None:
+            dump_stats(stats, STATS_CONFIG)
 
         print("\n\n")
 
@@ -0,0 +1,51 @@
+# Copyright lowRISC contributors.
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import tempfile
+import unittest
+
+from bignum_lib.assembler import Assembler
+from bignum_lib.machine import Machine
+
+# Program with a zero-iteration loop, its loop stack entry holds a remaining count of -1
+ZERO_ITERATION_LOOP_PROGRAM = """function main[4] {
+movi r0.0l, #1
+loop #0 (
+add r1, r1, r0
+)
+xor r2, r2, r2
+}
+"""
+
+
+def new_machine(src):
+    """Assemble a program and create a machine for it"""
+    assembler = Assembler(src.splitlines(True))
+    assembler.assemble()
+    imem = assembler.get_instruction_objects()
+    return Machine([0]*128, imem, 0, len(imem) - 1, assembler.get_instruction_context())
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def test_round_trip_with_loop_stack(self):
+        m = new_machine(ZERO_ITERATION_LOOP_PROGRAM)
+        m.run(max_instructions=2)
+        self.assertEqual(m.loop_stack[-1][0], -1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'checkpoint')
+            m.save_checkpoint(path)
+            loaded = new_machine(ZERO_ITERATION_LOOP_PROGRAM)
+            loaded.load_checkpoint(path)
+        saved = m.snapshot()
+        restored = loaded.snapshot()
+        for field in ('r', 'r_valid_half_limbs', 'sregs', 'flags', 'loop_stack', 'call_stack', 'pc', 'dmem',
+                      'init_dmem'):
+            self.assertEqual(getattr(restored, field), getattr(saved, field), field)
+        self.assertEqual(loaded.stop_addr, m.stop_addr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# Copyright lowRISC contributors.
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+import unittest
+
+from bignum_lib.assembler import Assembler
+from bignum_lib.machine import Machine
+from bignum_lib.stats import StatsCollector
+
+# Straight-line program without a stop address, execution falls off the end of imem
+STRAIGHT_LINE_PROGRAM = """function main[6] {
+xor r0, r0, r0
+movi r0.0l, #5
+xor r1, r1, r1
+add r1, r1, r0
+add r2, r1, r1
+subb r3, r2, r0
+}
+"""
+
+# Program ending with a loop body at the end of imem
+LOOP_AT_END_PROGRAM = """function main[6] {
+xor r0, r0, r0
+movi r0.0l, #1
+xor r1, r1, r1
+loop #3 (
+add r1, r1, r0
+add r2, r1, r0
+)
+}
+"""
+
+# Program with flag accesses of both groups in a loop body and in straight-line code
+FLAG_GROUPS_PROGRAM = """function main[9] {
+xor r0, r0, r0
+movi r0.0l, #3
+loop #4 (
+add r1, r1, r0
+subb r3, r3, r0
+addcx r2, r2, r0
+)
+cmpbx r1, r2
+addx r4, r1, r2
+xor r5, r5, r5
+}
+"""
+
+
+def run_program(src, translate, stats=None):
+    """Assemble and run a program until execution falls off the end of imem, return the machine"""
+    assembler = Assembler(src.splitlines(True))
+    assembler.assemble()
+    imem = assembler.get_instruction_objects()
+    # the stop address is never reached
+    m = Machine([0]*128, imem, 0, len(imem), assembler.get_instruction_context())
+    m.stats = stats
+    if translate:
+        m.enable_translation()
+    m.run()
+    return m
+
+
+class TranslatorTest(unittest.TestCase):
+
+    def assert_same_state(self, src):
+        interpreted = run_program(src, translate=False)
+        translated = run_program(src, translate=True)
+        self.assertEqual(translated.get_pc(), interpreted.get_pc())
+        self.assertEqual(translated.r, interpreted.r)
+        self.assertEqual(translated.flags, interpreted.flags)
+        self.assertEqual(list(translated.dmem), list(interpreted.dmem))
+        self.assertEqual(translated.executed_inst_cnt, interpreted.executed_inst_cnt)
+
+    def test_block_at_end_of_imem(self):
+        self.assert_same_state(STRAIGHT_LINE_PROGRAM)
+
+    def test_loop_at_end_of_imem(self):
+        self.assert_same_state(LOOP_AT_END_PROGRAM)
+
+    def test_stats(self):
+        interpreted = StatsCollector()
+        translated = StatsCollector()
+        run_program(FLAG_GROUPS_PROGRAM, translate=False, stats=interpreted)
+        run_program(FLAG_GROUPS_PROGRAM, translate=True, stats=translated)
+        self.assertEqual(translated.get_instruction_histo(), interpreted.get_instruction_histo())
+        self.assertEqual(translated.movi, interpreted.movi)
+        self.assertEqual(translated.flag_access, interpreted.flag_access)
+        self.assertEqual(translated.flag_group_switches, interpreted.flag_group_switches)
+        self.assertEqual(vars(translated.loop_iterations), vars(interpreted.loop_iterations))
+
+
+if __name__ == "__main__":
+    unittest.main()